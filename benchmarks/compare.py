@@ -0,0 +1,49 @@
+import argparse
+import json
+import sys
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+# python -m benchmarks.compare BASE.json NEW.json [--threshold 10]: per-route changes between two
+# reports of benchmarks/run.py. With --threshold, exits with 1 when a route's p95 got worse by more
+# than that many percent or its throughput dropped by more than that.
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, help="allowed regression in percent")
+    args = parser.parse_args()
+    with open(args.base) as file:
+        base = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+    print(f"{base['meta']['commit']} -> {new['meta']['commit']}")
+    print(f"{'route':<32}" + "".join(f"{metric:>24}" for metric in METRICS))
+    regressions = []
+    routes = [*dict.fromkeys([*base["routes"], *new["routes"]]), "total"]
+    for route in routes:
+        before = base["total"] if route == "total" else base["routes"].get(route, {})
+        after = new["total"] if route == "total" else new["routes"].get(route, {})
+        cells = []
+        for metric in METRICS:
+            percent = change(before.get(metric), after.get(metric))
+            cells.append(f"{before.get(metric)!s} -> {after.get(metric)!s}" + (f" ({percent:+.0f}%)" if percent is not None else ""))
+            if args.threshold is not None and percent is not None and route != "total" and (
+                    (metric == "p95_ms" and percent > args.threshold)
+                    or (metric == "throughput_rps" and -percent > args.threshold)):
+                regressions.append(f"{route} {metric} {percent:+.1f}%")
+        print(f"{route:<32}" + "".join(f"{cell:>24}" for cell in cells))
+    if regressions:
+        print("Regressions over the threshold: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
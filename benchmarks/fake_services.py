@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import json
+import re
+from collections import Counter
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+# Stand-in for the Google Calendar, Google userinfo and Telegram Bot APIs, so a benchmark
+# neither needs credentials nor measures the internet. The app is pointed at it through
+# GOOGLE_API_URL and TELEGRAM_API_URL. Events are kept in memory per bearer token.
+EVENTS_PATH = "/calendar/v3/calendars/primary/events"
+
+app = FastAPI(title="Fake Google / Telegram")
+app.state.latency = 0.0
+calendars = {}
+calls = Counter()
+
+
+async def delay():
+    if app.state.latency:
+        await asyncio.sleep(app.state.latency)
+
+
+def calendar(request: Request):
+    return calendars.setdefault(request.headers.get("authorization", ""), {})
+
+
+def apply(events, method, event_id, body):
+    # status and body of one calendar operation
+    if method == "POST":
+        if body["id"] in events:
+            return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+        events[body["id"]] = body
+        return 200, body
+    if event_id not in events:
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+    if method == "PATCH":
+        events[event_id].update(body)
+        return 200, events[event_id]
+    if method == "DELETE":
+        if events[event_id].get("status") == "cancelled":
+            return 410, {"error": {"code": 410, "message": "Resource has been deleted"}}
+        events[event_id]["status"] = "cancelled"
+        return 204, None
+    return 405, None
+
+
+@app.post(EVENTS_PATH)
+async def insert_event(request: Request):
+    calls["calendar.insert"] += 1
+    await delay()
+    status, body = apply(calendar(request), "POST", None, await request.json())
+    return JSONResponse(body, status_code=status)
+
+
+@app.get(EVENTS_PATH)
+async def list_events(request: Request):
+    calls["calendar.list"] += 1
+    await delay()
+    return {"items": list(calendar(request).values())}
+
+
+@app.delete(EVENTS_PATH + "/{event_id}")
+async def delete_event(event_id: str, request: Request):
+    calls["calendar.delete"] += 1
+    await delay()
+    status, body = apply(calendar(request), "DELETE", event_id, None)
+    return Response(status_code=status) if body is None else JSONResponse(body, status_code=status)
+
+
+@app.post("/batch/calendar/v3")
+async def batch(request: Request):
+    calls["calendar.batch"] += 1
+    await delay()
+    boundary = re.search(r'boundary="?([^";]+)"?', request.headers["content-type"]).group(1)
+    events = calendar(request)
+    parts = []
+    for part in (await request.body()).decode().split(f"--{boundary}"):
+        content_id = re.search(r"Content-ID: <(\d+)>", part)
+        if not content_id:
+            continue
+        http = part.split("\r\n\r\n", 1)[1]
+        request_line, _, rest = http.partition("\r\n")
+        method, path = request_line.split()[:2]
+        body = rest.split("\r\n\r\n", 1)[1].strip() if "Content-Type" in rest else ""
+        calls[f"calendar.batch.{method.lower()}"] += 1
+        status, response_body = apply(events, method, path.rpartition("/")[2], json.loads(body) if body else None)
+        parts.append(f"--response_boundary\r\nContent-Type: application/http\r\n"
+                     f"Content-ID: <response-{content_id.group(1)}>\r\n\r\nHTTP/1.1 {status} Fake\r\n"
+                     f"Content-Type: application/json\r\n\r\n{json.dumps(response_body) if response_body else ''}\r\n")
+    parts.append("--response_boundary--\r\n")
+    return Response("".join(parts), media_type="multipart/mixed; boundary=response_boundary")
+
+
+@app.get("/oauth2/v1/userinfo")
+async def userinfo(access_token: str):
+    calls["userinfo"] += 1
+    await delay()
+    # the benchmark users log in with their email as the Google token
+    return {"id": access_token, "email": access_token, "name": access_token.partition("@")[0]}
+
+
+@app.post("/bot{bot_token}/sendMessage")
+async def send_message(bot_token: str, request: Request):
+    calls["telegram.send"] += 1
+    await delay()
+    payload = await request.json()
+    return {"ok": True, "result": {"message_id": calls["telegram.send"], "chat": {"id": payload["chat_id"]}}}
+
+
+@app.get("/stats")
+async def stats():
+    return dict(calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Google Calendar / Telegram APIs for the benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8701)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    app.state.latency = args.latency
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
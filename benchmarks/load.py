@@ -0,0 +1,172 @@
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as day_time, timedelta, timezone
+import httpx
+from utils.dates import LOCAL_TZ
+
+# Share of each operation in the traffic mix, overridable with --mix name=weight,...
+DEFAULT_MIX = {
+    "meetings": 35,
+    "schedule": 10,
+    "rooms": 10,
+    "availability": 10,
+    "book": 20,
+    "cancel": 15,
+}
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (text or "").split(",")):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown operation {name!r}, expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def percentile(ordered, percent):
+    # nearest-rank percentile of a sorted list
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.started = time.perf_counter()
+
+    def record(self, route, latency, status, ok):
+        self.latencies[route].append(latency)
+        self.statuses[route][str(status)] += 1
+        if not ok:
+            self.errors[route] += 1
+
+    def summary(self, route, latencies, elapsed):
+        ordered = sorted(latencies)
+        ms = lambda value: round(value * 1000, 2) if value is not None else None
+        return {
+            "requests": len(ordered),
+            "errors": self.errors.get(route, 0) if route else sum(self.errors.values()),
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": ms(percentile(ordered, 50)),
+            "p95_ms": ms(percentile(ordered, 95)),
+            "p99_ms": ms(percentile(ordered, 99)),
+            "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+            "max_ms": ms(ordered[-1]) if ordered else None,
+        }
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        routes = {}
+        for route in sorted(self.latencies):
+            routes[route] = self.summary(route, self.latencies[route], elapsed)
+            routes[route]["statuses"] = dict(self.statuses[route])
+        return {
+            "duration_s": round(elapsed, 2),
+            "total": self.summary(None, [latency for values in self.latencies.values() for latency in values], elapsed),
+            "routes": routes,
+        }
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, email, seeded, recorder, rng):
+        self.client = client
+        self.email = email
+        self.seeded = seeded
+        self.recorder = recorder
+        self.rng = rng
+        self.headers = {}
+
+    async def call(self, route, method, url, expected, **kwargs):
+        # route is the template the latency is reported under
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(route, time.perf_counter() - started, type(e).__name__, False)
+            return None
+        self.recorder.record(route, time.perf_counter() - started, response.status_code, response.status_code in expected)
+        return response
+
+    async def login(self):
+        # the fake userinfo endpoint takes the email as the Google token
+        # (not measured, it happens before the run)
+        response = await self.client.post("/auth/login", json={"token": self.email})
+        if response.status_code != 200:
+            raise RuntimeError(f"Login of {self.email} failed: {response.status_code} {response.text}")
+        self.headers = {"Authorization": f"Bearer {response.json()['jwt_token']}"}
+
+    def room(self):
+        return self.rng.choice(self.seeded["rooms"])
+
+    def day(self, future=False):
+        days = self.seeded["days"]
+        if future:
+            today = datetime.now(LOCAL_TZ).date().isoformat()
+            days = [day for day in days if day >= today] or days
+        return self.rng.choice(days)
+
+    async def meetings(self):
+        await self.call("GET /app/meetings", "GET", "/app/meetings", {200},
+                        params={"room_id": self.room(), "query_date": self.day()})
+
+    async def schedule(self):
+        start = date.fromisoformat(self.day())
+        await self.call("GET /app/schedule", "GET", "/app/schedule", {200},
+                        params={"start_date": start.isoformat(), "end_date": (start + timedelta(days=6)).isoformat()})
+
+    async def rooms(self):
+        await self.call("GET /app/rooms", "GET", "/app/rooms", {200})
+
+    async def availability(self):
+        await self.call("GET /app/availability", "GET", "/app/availability", {200},
+                        params={"start_date": self.day(future=True), "min_duration": 30})
+
+    async def book(self):
+        # a random half-hour slot in working hours, 302 (already booked) is an expected answer
+        day = date.fromisoformat(self.day(future=True))
+        start = datetime.combine(day, day_time(8), tzinfo=LOCAL_TZ) + timedelta(minutes=30 * self.rng.randrange(24))
+        end = start + timedelta(minutes=self.rng.choice((30, 60)))
+        await self.call("POST /app/meetings", "POST", "/app/meetings", {201, 302}, json={
+            "room_id": self.room(), "organizer": self.email, "name": "Benchmark booking",
+            "description": "Booked by benchmarks/load.py", "start_time": start.isoformat(), "end_time": end.isoformat(),
+            "invited_users": [self.rng.choice(self.seeded["users"])],
+        })
+
+    async def cancel(self):
+        response = await self.call("GET /app/my-meetings", "GET", "/app/my-meetings", {200}, params={
+            "start": datetime.now(timezone.utc).isoformat(), "limit": 20, "with_invitations": "false",
+        })
+        if response is None or response.status_code != 200 or not response.json():
+            return
+        meeting = self.rng.choice(response.json())
+        # another virtual user of the same account may have cancelled it first
+        await self.call("DELETE /app/meetings/{id}", "DELETE", f"/app/meetings/{meeting['id']}", {204, 404})
+
+    async def run(self, mix, deadline):
+        operations = [getattr(self, name) for name in mix]
+        weights = list(mix.values())
+        while time.perf_counter() < deadline:
+            await self.rng.choices(operations, weights)[0]()
+
+
+async def run_load(base_url, seeded, vus, duration, mix, random_seed=1, recorder=None):
+    # vus concurrent users, each sending its next request as soon as the previous one returns
+    recorder = recorder or Recorder()
+    limits = httpx.Limits(max_connections=vus, max_keepalive_connections=vus)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        users = [VirtualUser(client, seeded["users"][index % len(seeded["users"])], seeded, recorder,
+                             random.Random(random_seed * 1000 + index))
+                 for index in range(vus)]
+        await asyncio.gather(*(user.login() for user in users))
+        recorder.started = time.perf_counter()
+        deadline = recorder.started + duration
+        await asyncio.gather(*(user.run(mix, deadline) for user in users))
+    return recorder
@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+from benchmarks import seed as seeding
+from benchmarks.load import run_load, parse_mix, Recorder, DEFAULT_MIX
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# python -m benchmarks.run [options]: seeds the benchmark data, starts the fake Google/Telegram
+# services and main_app (uvicorn), drives the traffic mix and writes the per-route report as JSON.
+# See benchmarks/README.md.
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load benchmark of the booking API")
+    parser.add_argument("--vus", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--mix", default="", help="operation weights, e.g. book=50,meetings=50 "
+                                                  f"(operations: {', '.join(DEFAULT_MIX)})")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the app")
+    parser.add_argument("--port", type=int, default=8700, help="port of the app")
+    parser.add_argument("--fake-port", type=int, default=8701, help="port of the fake Google/Telegram services")
+    parser.add_argument("--fake-latency", type=float, default=0.05, help="seconds every fake API call takes")
+    parser.add_argument("--base-url", help="benchmark an app that is already running (it must use the fake services "
+                                           "or real credentials) instead of starting one")
+    parser.add_argument("--no-seed", action="store_true", help="keep the data of the previous seeding")
+    parser.add_argument("--output", help="report path, default benchmarks/results/<commit>.json")
+    seeding.add_arguments(parser)
+    return parser.parse_args()
+
+
+def git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start(module_args, env):
+    return subprocess.Popen([sys.executable, "-m", *module_args], cwd=ROOT, env=env)
+
+
+def wait_ready(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not answer within {timeout} seconds")
+
+
+def stop(process):
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_report(report):
+    print(f"{'route':<32}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in [*report["routes"].items(), ("total", report["total"])]:
+        print(f"{route:<32}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']!s:>10}{stats['p95_ms']!s:>10}{stats['p99_ms']!s:>10}")
+
+
+async def benchmark(args, base_url):
+    options = seeding.seed_options(args)
+    seeded = await (seeding.existing(**options) if args.no_seed else seeding.seed(**options))
+    await seeding.async_engine.dispose()
+    if not seeded["rooms"]:
+        raise RuntimeError("No benchmark rooms, run without --no-seed first")
+    mix = parse_mix(args.mix)
+    if args.warmup > 0:
+        await run_load(base_url, seeded, args.vus, args.warmup, mix, random_seed=args.seed + 1)
+    recorder = await run_load(base_url, seeded, args.vus, args.duration, mix, random_seed=args.seed, recorder=Recorder())
+    return seeded, mix, recorder.report()
+
+
+def main():
+    args = parse_args()
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    env = dict(os.environ, GOOGLE_API_URL=fake_url, TELEGRAM_API_URL=fake_url)
+    env.setdefault("BOT_TOKEN", "bench")
+    env.setdefault("CHANNEL_ID", "bench")
+    env.setdefault("GOOGLE_API_KEY", "bench")
+    fake = app = None
+    try:
+        if args.base_url:
+            base_url = args.base_url
+        else:
+            fake = start(["benchmarks.fake_services", "--port", str(args.fake_port), "--latency", str(args.fake_latency)], env)
+            app = start(["uvicorn", "main:main_app", "--host", "127.0.0.1", "--port", str(args.port),
+                         "--workers", str(args.workers), "--log-level", "warning"], env)
+            base_url = f"http://127.0.0.1:{args.port}"
+            wait_ready(f"{fake_url}/stats", fake)
+            wait_ready(f"{base_url}/openapi.json", app)
+        seeded, mix, report = asyncio.run(benchmark(args, base_url))
+        external_calls = httpx.get(f"{fake_url}/stats").json() if fake is not None else None
+    finally:
+        stop(app)
+        stop(fake)
+
+    commit = git("rev-parse", "--short", "HEAD")
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "base_url": base_url,
+            "vus": args.vus,
+            "warmup_s": args.warmup,
+            "workers": None if args.base_url else args.workers,
+            "fake_latency_s": None if args.base_url else args.fake_latency,
+            "mix": mix,
+            "seed": {**seeding.seed_options(args), "meetings": seeded["meetings"]},
+        },
+        **report,
+        "external_calls": external_calls,
+    }
+    output = Path(args.output) if args.output else ROOT / "benchmarks" / "results" / f"{commit or 'report'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print_report(report)
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import random
+import uuid
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import delete, insert, or_, select
+from config.db import AsyncSessionLocal, async_engine
+from models import models
+from utils.dates import LOCAL_TZ
+
+# Everything seeded is recognisable by these prefixes and is replaced by the next run,
+# other rows of the database are left alone
+USER_PREFIX = "bench-"
+ROOM_PREFIX = "Bench room "
+EMAIL_DOMAIN = "example.com"
+CHUNK = 5000
+# working hours the seeded meetings are placed in
+DAY_START, DAY_END = 8, 20
+
+
+def user_email(index):
+    return f"{USER_PREFIX}{index}@{EMAIL_DOMAIN}"
+
+
+def days_around(today, past_days, future_days):
+    return [today + timedelta(days=offset) for offset in range(-past_days, future_days)]
+
+
+def day_meetings(day, count, rng):
+    # up to count non-overlapping meetings of 30-90 minutes between DAY_START and DAY_END
+    slots = sorted(rng.sample(range((DAY_END - DAY_START) * 2), min(count, (DAY_END - DAY_START) * 2)))
+    periods = []
+    busy_until = None
+    for slot in slots:
+        start = datetime.combine(day, time(DAY_START), tzinfo=LOCAL_TZ) + timedelta(minutes=30 * slot)
+        if busy_until is not None and start < busy_until:
+            continue
+        end = start + timedelta(minutes=rng.choice((30, 60, 90)))
+        periods.append((start, end))
+        busy_until = end
+    return periods
+
+
+async def clear(db):
+    users = select(models.User.id).where(models.User.id.like(f"{USER_PREFIX}%"))
+    rooms = select(models.Room.id).where(models.Room.name.like(f"{ROOM_PREFIX}%"))
+    meetings = select(models.Meeting.id).where(or_(models.Meeting.created_by.in_(users), models.Meeting.room_id.in_(rooms)))
+    await db.execute(delete(models.Invitation).where(models.Invitation.meeting_id.in_(meetings)))
+    await db.execute(delete(models.Meeting).where(models.Meeting.id.in_(meetings)))
+    await db.execute(delete(models.MeetingSeries).where(or_(models.MeetingSeries.created_by.in_(users),
+                                                            models.MeetingSeries.room_id.in_(rooms))))
+    await db.execute(delete(models.Room).where(models.Room.id.in_(rooms)))
+    await db.execute(delete(models.User).where(models.User.id.in_(users)))
+
+
+# Replaces the benchmark data, returns what the load driver needs to address it
+async def seed(users=50, rooms=20, meetings_per_day=6, past_days=7, future_days=21, invitees=2, random_seed=1):
+    rng = random.Random(random_seed)
+    today = datetime.now(LOCAL_TZ).date()
+    async with AsyncSessionLocal() as db:
+        await clear(db)
+        await db.execute(insert(models.User), [
+            # the fake userinfo endpoint answers with the token as the email
+            {"id": f"{USER_PREFIX}{index}", "fullname": f"Bench User {index}", "email": user_email(index),
+             "google_token": user_email(index)}
+            for index in range(users)
+        ])
+        room_ids = (await db.scalars(insert(models.Room).returning(models.Room.id),
+                                     [{"name": f"{ROOM_PREFIX}{index}"} for index in range(rooms)])).all()
+        meetings, invitations = [], []
+        for room_id in room_ids:
+            for day in days_around(today, past_days, future_days):
+                for start, end in day_meetings(day, meetings_per_day, rng):
+                    meeting_id = uuid.UUID(int=rng.getrandbits(128)).hex
+                    creator = rng.randrange(users)
+                    meetings.append({"id": meeting_id, "room_id": room_id, "created_by": f"{USER_PREFIX}{creator}",
+                                     "organizer": f"Bench User {creator}", "name": "Bench meeting",
+                                     "description": "Seeded by benchmarks/seed.py", "start_time": start, "end_time": end})
+                    invitations.extend({"meeting_id": meeting_id, "user_email": user_email(index)}
+                                       for index in rng.sample(range(users), min(invitees, users)))
+        for offset in range(0, len(meetings), CHUNK):
+            await db.execute(insert(models.Meeting), meetings[offset:offset + CHUNK])
+        for offset in range(0, len(invitations), CHUNK):
+            await db.execute(insert(models.Invitation), invitations[offset:offset + CHUNK])
+        await db.commit()
+    return {
+        "users": [user_email(index) for index in range(users)],
+        "rooms": list(room_ids),
+        "days": [day.isoformat() for day in days_around(today, past_days, future_days)],
+        "meetings": len(meetings),
+    }
+
+
+async def existing(users=50, past_days=7, future_days=21, **options):
+    # what seed() returned, for the data of a previous run
+    today = datetime.now(LOCAL_TZ).date()
+    async with AsyncSessionLocal() as db:
+        room_ids = (await db.scalars(select(models.Room.id).where(models.Room.name.like(f"{ROOM_PREFIX}%"))
+                                     .order_by(models.Room.id))).all()
+    return {
+        "users": [user_email(index) for index in range(users)],
+        "rooms": list(room_ids),
+        "days": [day.isoformat() for day in days_around(today, past_days, future_days)],
+        "meetings": None,
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--meetings-per-day", type=int, default=6, help="per room")
+    parser.add_argument("--past-days", type=int, default=7)
+    parser.add_argument("--future-days", type=int, default=21)
+    parser.add_argument("--invitees", type=int, default=2, help="per meeting")
+    parser.add_argument("--seed", type=int, default=1, help="random seed, the same seed gives the same data")
+
+
+def seed_options(args):
+    return {"users": args.users, "rooms": args.rooms, "meetings_per_day": args.meetings_per_day,
+            "past_days": args.past_days, "future_days": args.future_days, "invitees": args.invitees,
+            "random_seed": args.seed}
+
+
+async def main(args):
+    try:
+        seeded = await seed(**seed_options(args))
+    finally:
+        await async_engine.dispose()
+    print(f"Seeded {len(seeded['users'])} users, {len(seeded['rooms'])} rooms, {seeded['meetings']} meetings")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the benchmark users, rooms and meetings")
+    add_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
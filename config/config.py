@@ -19,3 +19,100 @@ EMAIL_USERNAME = os.environ.get("EMAIL_USERNAME")
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
 CHANNEL_ID = os.environ.get("CHANNEL_ID")
+# Base URLs of the external APIs, pointed at local fakes by the benchmarks (benchmarks/fake_services.py)
+GOOGLE_API_URL = os.environ.get("GOOGLE_API_URL", "https://www.googleapis.com")
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# Connection pool, see config/db.py
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+# Milliseconds, 0 leaves the server default (no timeout)
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", 0))
+
+# In-process cache of authenticated users (seconds / entries), 0 ttl disables it
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", 60))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))
+ROLE_CACHE_TTL = int(os.environ.get("ROLE_CACHE_TTL", 300))
+ROOM_CACHE_TTL = int(os.environ.get("ROOM_CACHE_TTL", 3600))
+
+# Timezone the office works in, used to turn dates into timestamp ranges
+TIMEZONE = os.environ.get("TIMEZONE", "Asia/Tashkent")
+# Working hours (local time) used when looking for free slots
+WORKDAY_START_HOUR = int(os.environ.get("WORKDAY_START_HOUR", 0))
+WORKDAY_END_HOUR = int(os.environ.get("WORKDAY_END_HOUR", 24))
+# Longest date range of one GET /app/availability
+AVAILABILITY_MAX_DAYS = int(os.environ.get("AVAILABILITY_MAX_DAYS", 31))
+
+# Outbox dispatcher (utils/outbox.py) delivering booking side effects
+OUTBOX_DISPATCHER_ENABLED = os.environ.get("OUTBOX_DISPATCHER_ENABLED", "true").lower() in ("1", "true", "yes")
+OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", 5))
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_CONCURRENCY = int(os.environ.get("OUTBOX_CONCURRENCY", 10))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 8))
+# Seconds a claimed event stays invisible to other dispatchers
+OUTBOX_LEASE = int(os.environ.get("OUTBOX_LEASE", 120))
+# Days delivered events are kept before the dispatcher deletes them (failed ones are kept)
+OUTBOX_RETENTION_DAYS = int(os.environ.get("OUTBOX_RETENTION_DAYS", 7))
+
+# Shared outbound HTTP client (utils/http_client.py), timeout in seconds
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 10))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 2))
+# Longest wait before a retry; a Retry-After above it is not waited for, the response is returned
+HTTP_RETRY_MAX_BACKOFF = float(os.environ.get("HTTP_RETRY_MAX_BACKOFF", 10))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 100))
+
+# Telegram notifications (utils/bot_requests.py): messages per second and burst per chat,
+# and the window in seconds during which messages to a chat are merged into one digest
+TELEGRAM_CHAT_RATE = float(os.environ.get("TELEGRAM_CHAT_RATE", 1 / 3))
+TELEGRAM_CHAT_BURST = int(os.environ.get("TELEGRAM_CHAT_BURST", 3))
+TELEGRAM_COALESCE_WINDOW = float(os.environ.get("TELEGRAM_COALESCE_WINDOW", 2))
+TELEGRAM_MAX_RETRIES = int(os.environ.get("TELEGRAM_MAX_RETRIES", 3))
+
+# Invitation email (utils/mailer.py), sent from EMAIL_USERNAME; idle sessions older than SMTP_MAX_IDLE seconds are reopened
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 465))
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 2))
+SMTP_MAX_IDLE = float(os.environ.get("SMTP_MAX_IDLE", 60))
+SMTP_BATCH_SIZE = int(os.environ.get("SMTP_BATCH_SIZE", 50))
+
+# Calendar reconciliation (utils/calendar_sync.py): seconds between passes (0 disables it)
+# and how many days ahead meetings are compared with the Google calendars.
+# One process must run it: `python -m utils.calendar_sync`, or a single app worker with
+# CALENDAR_RECONCILER_ENABLED, otherwise every uvicorn worker would make its own passes
+CALENDAR_RECONCILER_ENABLED = os.environ.get("CALENDAR_RECONCILER_ENABLED", "false").lower() in ("1", "true", "yes")
+CALENDAR_RECONCILE_INTERVAL = float(os.environ.get("CALENDAR_RECONCILE_INTERVAL", 3600))
+CALENDAR_RECONCILE_DAYS = int(os.environ.get("CALENDAR_RECONCILE_DAYS", 30))
+
+# Page size of the list endpoints (?limit=), see utils/pagination.py
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 1000))
+
+# LISTEN connection (utils/pg_listener.py) keeping in-process caches in step with the database
+PG_LISTENER_ENABLED = os.environ.get("PG_LISTENER_ENABLED", "true").lower() in ("1", "true", "yes")
+PG_LISTENER_RECONNECT_DELAY = float(os.environ.get("PG_LISTENER_RECONNECT_DELAY", 5))
+
+# Upper bound of the occurrences of one recurring meeting series
+RECURRENCE_MAX_OCCURRENCES = int(os.environ.get("RECURRENCE_MAX_OCCURRENCES", 1000))
+
+# Most meetings booked by one POST /app/meetings/batch
+BATCH_MAX_MEETINGS = int(os.environ.get("BATCH_MAX_MEETINGS", 100))
+
+# Live meeting changes over WebSocket (utils/live_feed.py): changes buffered per client before it is reset
+LIVE_FEED_QUEUE_SIZE = int(os.environ.get("LIVE_FEED_QUEUE_SIZE", 100))
+
+# Longest date range of one GET /app/schedule
+SCHEDULE_MAX_DAYS = int(os.environ.get("SCHEDULE_MAX_DAYS", 31))
+
+# Prometheus metrics (utils/metrics.py) on GET /metrics
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Static bearer token of the scraper (`authorization: {credentials: ...}` in the Prometheus scrape config),
+# /metrics is not served without it
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Debug mode: responses carry their query count and database time (X-DB-Query-Count, X-DB-Query-Time-Ms)
+DEBUG = os.environ.get("DEBUG", "false").lower() in ("1", "true", "yes")
+# Queries slower than this many milliseconds are logged by config/db.py, 0 disables the log
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))
@@ -1,13 +1,134 @@
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import MetaData, create_engine
-from config.config import DB_USER, DB_HOST, DB_NAME, DB_PORT, DB_PASSWORD
+import logging
+import time
+from contextvars import ContextVar
+from sqlalchemy import MetaData, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from config.config import DB_USER, DB_HOST, DB_NAME, DB_PORT, DB_PASSWORD, DB_POOL_SIZE, DB_MAX_OVERFLOW, \
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT, SLOW_QUERY_MS, TIMEZONE
 
+logger = logging.getLogger(__name__)
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+# Time spent waiting for a connection from the pool, per pool logging name
+class PoolWaitStats:
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds, timed_out=False):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if timed_out:
+            self.timeouts += 1
+
+
+pool_wait_stats = {"async": PoolWaitStats()}
+
+
+class TimedPoolMixin:
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_wait_stats[self.logging_name].record(time.perf_counter() - started, timed_out)
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+pool_options = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+# app.timezone is the local day the meeting triggers key change versions and notifications by,
+# see migration d5f1a8c3e7b2; it has to match utils.dates.LOCAL_TZ
+async_connect_args = {"server_settings": {"app.timezone": TIMEZONE}}
+if DB_STATEMENT_TIMEOUT:
+    async_connect_args["server_settings"]["statement_timeout"] = str(DB_STATEMENT_TIMEOUT)
 
 metadata = MetaData()
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine used by the API, so queries don't block the event loop.
+# expire_on_commit is off: objects are read after commit (e.g. for the response)
+# and an expired attribute can't be lazily reloaded outside of an await.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool, pool_logging_name="async",
+                                   connect_args=async_connect_args, **pool_options)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+# Queries run and time spent in them by the current request, set by utils.metrics.MetricsMiddleware
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+query_stats = ContextVar("query_stats", default=None)
+
+
+def parameters_shape(parameters, executemany=False):
+    # the types of the parameters, their values are not logged
+    if executemany:
+        return f"{len(parameters)} x {parameters_shape(parameters[0])}" if parameters else "[]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {parameters_shape(value)}" for name, value in parameters.items()) + "}"
+    if isinstance(parameters, tuple):
+        return "(" + ", ".join(parameters_shape(value) for value in parameters) + ")"
+    if isinstance(parameters, list):
+        return f"list[{len(parameters)}]"
+    return type(parameters).__name__
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_started
+    stats = query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s; parameters %s", elapsed * 1000, " ".join(statement.split())[:2000],
+                       parameters_shape(parameters, executemany))
+
+
+event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+event.listen(async_engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def pool_status(db_engine=async_engine):
+    pool = db_engine.pool
+    waits = pool_wait_stats[pool.logging_name]
+    return {
+        "size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "waits": waits.count,
+        "wait_timeouts": waits.timeouts,
+        "wait_avg_ms": round(waits.total / waits.count * 1000, 3) if waits.count else 0.0,
+        "wait_max_ms": round(waits.max * 1000, 3),
+    }
 
 # database = databases.Database(DATABASE_URL)
 # engine = create_engine(DATABASE_URL)
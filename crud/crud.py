@@ -1,116 +1,165 @@
 from fastapi import HTTPException, status
-from sqlalchemy import and_, cast, Date, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, cast, Date, DateTime, Integer, or_, select, update, delete, func, tuple_, bindparam, case
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from models import models
 from sqlalchemy.exc import IntegrityError
 from schemas.schemas import *
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.orm.exc import UnmappedClassError, UnmappedInstanceError
+from utils.cache import user_cache, role_cache, room_cache
+from utils.pg_listener import pg_listener
+from utils.dates import day_bounds
+from utils.recurrence import occurrences, overlapping
 
 
 # ----------------------- USER ROLES OPERATIONS ------------------------------------
-def get_all_roles(db: Session):
-    query = db.query(models.UserRole).all()
-    return query
+async def get_all_roles(db: AsyncSession):
+    query = await db.scalars(select(models.UserRole))
+    return query.all()
 
 
-def get_role(id, db: Session):
-    query = db.query(models.UserRole).get(id)
+async def get_role(id, db: AsyncSession):
+    query = await db.get(models.UserRole, id)
     return query
 
 
-def create_role(db: Session, form_data: CreateUserRole):
+async def create_role(db: AsyncSession, form_data: CreateUserRole):
     query = models.UserRole(role=form_data.role,
                             permissions=form_data.permissions)
     try:
         db.add(query)
-        db.commit()
-        db.refresh(query)
+        await db.commit()
+        await db.refresh(query)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
     else:
+        role_cache.clear()
         return query
 
 
-def delete_role(id, db: Session):
-    query = db.query(models.UserRole).filter(models.UserRole.id == id).delete(synchronize_session=False)
-    db.commit()
-    return query
+async def delete_role(id, db: AsyncSession):
+    query = await db.execute(delete(models.UserRole).where(models.UserRole.id == id))
+    await db.commit()
+    role_cache.clear()
+    # users.role_id cascades on delete, so cached users of the role may be gone as well
+    user_cache.clear()
+    return query.rowcount
 
 
-def update_role(db: Session, id, role: CreateUserRole):
-    obj = db.query(models.UserRole).filter(models.UserRole.id == id).update(dict(role))
-    db.commit()
-    return obj
+async def update_role(db: AsyncSession, id, role: CreateUserRole):
+    obj = await db.execute(update(models.UserRole).where(models.UserRole.id == id).values(**role.model_dump()))
+    await db.commit()
+    role_cache.clear()
+    return obj.rowcount
 
 
 # ----------------------- ROOMS OPERATIONS ------------------------------------
-def get_all_rooms(db: Session):
-    query = db.query(models.Room).order_by(models.Room.id.asc()).all()
-    return query
-
-
-def get_room(id, db: Session):
-    query = db.query(models.Room).get(id)
+async def get_all_rooms(db: AsyncSession):
+    # read through room_cache, which is only trusted while change notifications are received
+    if pg_listener.connected:
+        rooms = room_cache.get("all")
+        if rooms is not None:
+            return rooms
+    generation = room_cache.generation
+    query = await db.scalars(select(models.Room).order_by(models.Room.id.asc()))
+    rooms = [GetRoom.model_validate(room) for room in query.all()]
+    if pg_listener.connected and generation == room_cache.generation:
+        room_cache.set("all", rooms)
+    return rooms
+
+
+async def get_room(id, db: AsyncSession):
+    rooms = room_cache.get("all") if pg_listener.connected else None
+    if rooms is not None:
+        return next((room for room in rooms if room.id == id), None)
+    query = await db.get(models.Room, id)
     return query
 
 
-def create_room(db: Session, form_data: CreateRoom):
+async def create_room(db: AsyncSession, form_data: CreateRoom):
     query = models.Room(name=form_data.name)
     try:
         db.add(query)
-        db.commit()
-        db.refresh(query)
+        await db.commit()
+        await db.refresh(query)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
     else:
+        room_cache.clear()
         return query
 
 
-def update_room(id, room: CreateRoom, db: Session):
-    obj = db.query(models.Room).filter(models.Room.id == id).update(dict(room))
-    db.commit()
-    return obj
+async def update_room(id, room: CreateRoom, db: AsyncSession):
+    obj = await db.execute(update(models.Room).where(models.Room.id == id).values(**room.model_dump()))
+    await db.commit()
+    room_cache.clear()
+    return obj.rowcount
 
 
 # ----------------------- USERS OPERATIONS ------------------------------------
-def get_all_users(db: Session):
-    query = db.query(models.User).all()
+# List functions take a page limit and the key of the last row of the previous page (after),
+# and return up to limit + 1 rows, see utils/pagination.py
+async def get_all_users(db: AsyncSession, limit=None, after=None):
+    statement = select(models.User).order_by(models.User.id)
+    if after is not None:
+        statement = statement.where(models.User.id > after[0])
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    query = await db.scalars(statement)
+    return query.all()
+
+
+async def get_user(id, db: AsyncSession):
+    query = await db.get(models.User, id)
+    # query = db.query(models.User).filter(models.User.id == id).first()
     return query
 
 
-def get_user(id, db: Session):
-    query = db.query(models.User).get(id)
-    # query = db.query(models.User).filter(models.User.id == id).first()
-    return query
+async def check_email(db: AsyncSession, email):
+    query = await db.scalars(select(models.User).where(models.User.email == email))
+    return query.first()
 
 
-def check_email(db: Session, email):
-    query = db.query(models.User).filter(models.User.email == email).first()
-    return query
+async def get_user_with_role(db: AsyncSession, email):
+    query = await db.scalars(select(models.User).options(joinedload(models.User.role)).where(models.User.email == email))
+    return query.first()
+
+
+async def get_users(ids, db: AsyncSession):
+    query = await db.scalars(select(models.User).where(models.User.id.in_(ids)))
+    return query.all()
+
 
+async def get_calendar_users(db: AsyncSession):
+    # users whose Google calendar gets their bookings
+    query = await db.scalars(select(models.User).where(models.User.google_token.is_not(None)))
+    return query.all()
 
-def create_user(db: Session, form_data):
+
+async def create_user(db: AsyncSession, form_data):
     query = models.User(id=form_data['sub'],
                         fullname=form_data['name'],
                         email=form_data['email']
                         )
     try:
         db.add(query)
-        db.commit()
-        db.refresh(query)
+        await db.commit()
+        await db.refresh(query)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
     else:
         return query
 
 
-def get_or_create_user(db: Session, form_data):
-    user_obj = db.query(models.User).filter(models.User.email == form_data['email']).first()
+async def get_or_create_user(db: AsyncSession, form_data):
+    user_obj = await check_email(db=db, email=form_data['email'])
     if user_obj:
         user_obj.google_token = form_data['google_token']
-        db.commit()
-        db.refresh(user_obj)
+        await db.commit()
+        await db.refresh(user_obj)
+        user_cache.pop(user_obj.email)
         return user_obj
 
     new_user = models.User(id=form_data['id'],
@@ -119,59 +168,151 @@ def get_or_create_user(db: Session, form_data):
                            google_token=form_data['google_token']
                            )
     db.add(new_user)
-    db.commit()
+    await db.commit()
     # db.refresh(query)
     return new_user
 
 
 # ----------------------- MEETINGS OPERATIONS ------------------------------------
-def get_all_meetings(db: Session):
-    query = db.query(models.Meeting).all()
-    return query
-
-
-def get_all_meetings_of_room_by_date(room_id, date, db: Session):
-    query = db.query(models.Meeting).filter(models.Meeting.room_id == room_id).filter(
-        and_(
-            cast(models.Meeting.start_time, Date) == date,
-            cast(models.Meeting.end_time, Date) == date
-        )
-    ).all()
-    return query
+# SQLSTATE of the meetings_room_period_excl exclusion constraint violation
+BOOKING_CONFLICT = '23P01'
 
 
-def get_all_meetings_of_room(room_id, db: Session):
-    query = db.query(models.Meeting).filter(models.Meeting.room_id == room_id).all()
-    return query
+def is_booking_conflict(error: IntegrityError):
+    return getattr(error.orig, 'pgcode', None) == BOOKING_CONFLICT
 
 
-def get_meeting(id, db: Session):
-    query = db.query(models.Meeting).filter(models.Meeting.id == id).first()
-    return query
+def load_invitations(statement, with_invitations=True):
+    # invitees of all returned meetings in one extra SELECT ... WHERE meeting_id IN (...)
+    if with_invitations:
+        statement = statement.options(selectinload(models.Meeting.invitation))
+    return statement
 
 
-def check_meeting(db: Session, form_data: CreateMeeting):
-    query = db.query(models.Meeting).filter(models.Meeting.room_id == form_data.room_id).filter(
-        or_(
-            and_(
-                models.Meeting.start_time <= form_data.start_time,
-                models.Meeting.end_time >= form_data.start_time
-            ),
-            and_(
-                models.Meeting.start_time <= form_data.end_time,
-                models.Meeting.end_time >= form_data.end_time
-            )
-        )
-    ).first()
-    return query
+def paginate_meetings(statement, limit=None, after=None, start=None, end=None):
+    # meetings starting in [start, end), in (start_time, id) order after the given key
+    if start is not None:
+        statement = statement.where(models.Meeting.start_time >= start)
+    if end is not None:
+        statement = statement.where(models.Meeting.start_time < end)
+    if after is not None:
+        statement = statement.where(tuple_(models.Meeting.start_time, models.Meeting.id) > tuple_(*after))
+    statement = statement.order_by(models.Meeting.start_time, models.Meeting.id)
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    return statement
 
 
-def get_all_user_meetings(user_id, db: Session):
-    query = db.query(models.Meeting).filter(models.Meeting.created_by == user_id).all()
-    return query
+async def get_all_meetings(db: AsyncSession, limit=None, after=None, start=None, end=None, with_invitations=True):
+    query = await db.scalars(load_invitations(paginate_meetings(select(models.Meeting), limit, after, start, end),
+                                              with_invitations))
+    return query.all()
 
 
-def create_meeting(db: Session, form_data: CreateMeeting, meeting_id, creator):
+async def get_all_meetings_of_room_by_date(room_id, date, db: AsyncSession, with_invitations=True):
+    # plain range predicates on start_time so ix_meetings_room_id_start_time can be used
+    day_start, day_end = day_bounds(date)
+    statement = load_invitations(select(models.Meeting), with_invitations)
+    query = await db.scalars(statement.where(models.Meeting.room_id == room_id).where(
+        and_(
+            models.Meeting.start_time >= day_start,
+            models.Meeting.start_time < day_end,
+            models.Meeting.end_time <= day_end
+        )
+    ).order_by(models.Meeting.start_time))
+    return query.all()
+
+
+async def get_all_meetings_of_room(room_id, db: AsyncSession, limit=None, after=None, start=None, end=None,
+                                   with_invitations=True):
+    statement = load_invitations(select(models.Meeting), with_invitations).where(models.Meeting.room_id == room_id)
+    query = await db.scalars(paginate_meetings(statement, limit, after, start, end))
+    return query.all()
+
+
+async def get_busy_periods(start, end, db: AsyncSession):
+    # one range query for every room, served by the gist index on (room_id, period)
+    query = await db.execute(select(models.Meeting.room_id, models.Meeting.start_time, models.Meeting.end_time).where(
+        models.Meeting.period.overlaps(func.tstzrange(start, end, '[)'))
+    ).order_by(models.Meeting.room_id, models.Meeting.start_time))
+    return query.all()
+
+
+async def get_schedule(start, end, db: AsyncSession, room_ids=None):
+    # columns of the schedule grid for meetings starting in [start, end), one range query for all rooms,
+    # served by ix_meetings_room_id_start_time (or ix_meetings_start_time_id for every room)
+    statement = select(models.Meeting.id, models.Meeting.room_id, models.Meeting.name, models.Meeting.organizer,
+                       models.Meeting.start_time, models.Meeting.end_time).where(
+        models.Meeting.start_time >= start, models.Meeting.start_time < end
+    )
+    if room_ids:
+        statement = statement.where(models.Meeting.room_id.in_(room_ids))
+    query = await db.execute(statement.order_by(models.Meeting.room_id, models.Meeting.start_time))
+    return query.all()
+
+
+# Rows per round trip of the export's server-side cursor
+EXPORT_YIELD_PER = 1000
+
+
+async def stream_meetings(db: AsyncSession, start=None, end=None, room_id=None, with_details=False):
+    # plain rows instead of ORM objects, read through a server-side cursor in EXPORT_YIELD_PER partitions;
+    # with_details adds the room name and the invitee emails (aggregated per meeting in the same query)
+    columns = [models.Meeting.id, models.Meeting.room_id, models.Meeting.created_by, models.Meeting.organizer,
+               models.Meeting.name, models.Meeting.description, models.Meeting.start_time, models.Meeting.end_time]
+    statement = select(*columns)
+    if with_details:
+        invitees = select(func.array_agg(models.Invitation.user_email)).where(
+            models.Invitation.meeting_id == models.Meeting.id
+        ).scalar_subquery()
+        statement = select(*columns, models.Room.name.label('room_name'), invitees.label('invitees')).join(models.Room)
+    if room_id is not None:
+        statement = statement.where(models.Meeting.room_id == room_id)
+    statement = paginate_meetings(statement, start=start, end=end).execution_options(yield_per=EXPORT_YIELD_PER)
+    result = await db.stream(statement)
+    async for partition in result.mappings().partitions():
+        yield partition
+
+
+async def get_meeting(id, db: AsyncSession):
+    query = await db.scalars(load_invitations(select(models.Meeting)).where(models.Meeting.id == id))
+    return query.first()
+
+
+async def get_meeting_with_details(id, db: AsyncSession):
+    # meeting with its room and creator, for the calendar side effects
+    query = await db.scalars(load_invitations(select(models.Meeting)).options(
+        joinedload(models.Meeting.room), joinedload(models.Meeting.user)
+    ).where(models.Meeting.id == id))
+    return query.first()
+
+
+async def get_meetings_with_details(ids, db: AsyncSession):
+    query = await db.scalars(load_invitations(select(models.Meeting)).options(
+        joinedload(models.Meeting.room), joinedload(models.Meeting.user)
+    ).where(models.Meeting.id.in_(ids)))
+    return query.unique().all()
+
+
+async def get_user_meetings_between(user_id, start, end, db: AsyncSession):
+    query = await db.scalars(load_invitations(select(models.Meeting)).options(joinedload(models.Meeting.room)).where(
+        models.Meeting.created_by == user_id,
+        models.Meeting.period.overlaps(func.tstzrange(start, end, '[)'))
+    ))
+    return query.all()
+
+
+async def get_all_user_meetings(user_id, db: AsyncSession, limit=None, after=None, start=None, end=None,
+                                with_invitations=True):
+    statement = load_invitations(select(models.Meeting), with_invitations).where(models.Meeting.created_by == user_id)
+    query = await db.scalars(paginate_meetings(statement, limit, after, start, end))
+    return query.all()
+
+
+# Inserts the meeting, its invitations and the outbox events in one transaction,
+# returns (meeting, invited emails) or None if the room is already booked.
+# invitation_event is a (kind, payload) event added with the invited emails as its receivers
+async def create_meeting(db: AsyncSession, form_data: CreateMeeting, meeting_id, creator, events=(), invitation_event=None):
     query = models.Meeting(id=meeting_id,
                            room_id=form_data.room_id,
                            created_by=creator,
@@ -181,55 +322,290 @@ def create_meeting(db: Session, form_data: CreateMeeting, meeting_id, creator):
                            start_time=form_data.start_time,
                            end_time=form_data.end_time
                            )
+    # overlapping bookings are rejected by the database, see models.Meeting
     try:
         db.add(query)
-        db.commit()
-        db.refresh(query)
-    except IntegrityError:
-        db.rollback()
-
+        await db.flush()
+        if await get_series_conflict(room_id=form_data.room_id, start=form_data.start_time, end=form_data.end_time, db=db):
+            await db.rollback()
+            return None
+        invited_users = await create_invitations(db=db, user_emails=form_data.invited_users or [], meeting_id=meeting_id)
+        add_outbox_events(db=db, events=events)
+        if invitation_event and invited_users:
+            kind, payload = invitation_event
+            add_outbox_events(db=db, events=[(kind, {**payload, "receivers": list(invited_users)})])
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if is_booking_conflict(e):
+            return None
+        raise
+
+    return query, invited_users
+
+
+async def create_meetings(db: AsyncSession, meetings, creator, events=(), invitation_events=None):
+    # meetings are (meeting_id, CreateMeeting) pairs, inserted all or none in one transaction;
+    # returns None if any of them overlaps an existing meeting or series occurrence.
+    # invitation_events maps meeting ids to (kind, payload) events added with the meeting's invited emails as receivers
+    bookings = sorted((form_data.room_id, form_data.start_time, form_data.end_time) for _, form_data in meetings)
+    by_room = {}
+    for room_id, start, end in bookings:
+        by_room.setdefault(room_id, []).append((start, end))
+    # rooms are locked in id order, so two batches can't wait on each other
+    for room_id in by_room:
+        await lock_room(room_id=room_id, db=db)
+    conflict = await get_meeting_conflict(bookings=bookings, db=db)
+    if conflict is None:
+        start, end = min(start for _, start, _ in bookings), max(end for _, _, end in bookings)
+        for series in await get_series_between(start=start, end=end, db=db):
+            if series.room_id in by_room and overlapping(by_room[series.room_id], list(occurrences(series, start, end))):
+                conflict = series
+                break
+    if conflict is not None:
+        await db.rollback()
+        return None
+    query = [models.Meeting(id=meeting_id, room_id=form_data.room_id, created_by=creator, organizer=form_data.organizer,
+                            name=form_data.name, description=form_data.description, start_time=form_data.start_time,
+                            end_time=form_data.end_time)
+             for meeting_id, form_data in meetings]
+    invitations = [{"user_email": user_email, "meeting_id": meeting_id}
+                   for meeting_id, form_data in meetings for user_email in dict.fromkeys(form_data.invited_users or [])]
+    try:
+        db.add_all(query)
+        await db.flush()
+        receivers = {}
+        if invitations:
+            inserted = await db.execute(insert(models.Invitation).values(invitations)
+                                        .returning(models.Invitation.meeting_id, models.Invitation.user_email))
+            for meeting_id, user_email in inserted:
+                receivers.setdefault(meeting_id, []).append(user_email)
+        add_outbox_events(db=db, events=events)
+        add_outbox_events(db=db, events=[(kind, {**payload, "receivers": receivers[meeting_id]})
+                                         for meeting_id, (kind, payload) in (invitation_events or {}).items()
+                                         if meeting_id in receivers])
+        await db.commit()
+    except IntegrityError as e:
+        # a meeting booked after the check above
+        await db.rollback()
+        if is_booking_conflict(e):
+            return None
+        raise
     return query
 
 
-def delete_own_meeting(id, user_id, db: Session):
-    query = db.query(models.Meeting).filter(and_(models.Meeting.id == id,
-                                                 models.Meeting.created_by == user_id)
-                                            ).first()
+async def delete_own_meeting(id, user_id, db: AsyncSession, events=()):
+    # invitations are loaded as the delete detaches them from the meeting
+    query = await db.scalars(load_invitations(select(models.Meeting)).where(and_(models.Meeting.id == id,
+                                                                                 models.Meeting.created_by == user_id)
+                                                                            ))
+    query = query.first()
     try:
-        db.delete(query)
-        db.commit()
+        await db.delete(query)
+        add_outbox_events(db=db, events=events)
+        await db.commit()
     except (AttributeError, UnmappedInstanceError):
         return False
     else:
         return query
 
 
-def update_meeting(id, meeting: CreateMeeting, db: Session):
-    obj = db.query(models.Meeting).filter(models.Meeting.id == id).update(dict(meeting))
-    db.commit()
-    return obj
+async def update_meeting(id, meeting: CreateMeeting, db: AsyncSession):
+    # invited_users is not a column of meetings, and unset optional fields must not wipe stored values
+    # returns None if the new period overlaps another booking of the room
+    try:
+        obj = await db.execute(update(models.Meeting).where(models.Meeting.id == id).values(
+            **meeting.model_dump(exclude_unset=True, exclude={'invited_users'})
+        ).returning(models.Meeting.room_id, models.Meeting.start_time, models.Meeting.end_time))
+        updated = obj.first()
+        if updated and await get_series_conflict(room_id=updated.room_id, start=updated.start_time,
+                                                 end=updated.end_time, db=db):
+            await db.rollback()
+            return None
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if is_booking_conflict(e):
+            return None
+        raise
+    return 1 if updated else 0
+
+
+# ----------------------- MEETING SERIES OPERATIONS ------------------------------------
+# Occurrences are not rows of meetings, so the exclusion constraint doesn't see them. Instead every
+# booking holds a lock on its room row while checking the series (FOR KEY SHARE, which bookings of
+# the room don't block each other with), and creating a series locks the room row exclusively.
+async def lock_room(room_id, db: AsyncSession, exclusive=False):
+    statement = select(models.Room.id).where(models.Room.id == room_id)
+    if exclusive:
+        statement = statement.with_for_update()
+    else:
+        statement = statement.with_for_update(read=True, key_share=True)
+    return await db.scalar(statement)
+
+
+async def get_series_between(start, end, db: AsyncSession, room_id=None):
+    statement = select(models.MeetingSeries).where(models.MeetingSeries.start_time < end,
+                                                   models.MeetingSeries.ends_at > start)
+    if room_id is not None:
+        statement = statement.where(models.MeetingSeries.room_id == room_id)
+    query = await db.scalars(statement.order_by(models.MeetingSeries.room_id))
+    return query.all()
+
+
+async def get_series_conflict(room_id, start, end, db: AsyncSession):
+    # occurrence of a series in the room overlapping [start, end), or None
+    await lock_room(room_id=room_id, db=db)
+    for series in await get_series_between(start=start, end=end, room_id=room_id, db=db):
+        for occurrence in occurrences(series, start, end):
+            return occurrence
+    return None
+
+
+async def get_meeting_conflict(bookings, db: AsyncSession):
+    # one query for all (room_id, start, end) bookings: a meeting overlapping any of them, or None
+    periods = func.unnest(bindparam('room_ids', [room_id for room_id, _, _ in bookings], type_=ARRAY(Integer)),
+                          bindparam('starts', [start for _, start, _ in bookings], type_=ARRAY(DateTime(timezone=True))),
+                          bindparam('ends', [end for _, _, end in bookings], type_=ARRAY(DateTime(timezone=True)))
+                          ).table_valued('room_id', 'start_time', 'end_time').render_derived(name='periods')
+    query = await db.scalars(select(models.Meeting).join(periods, and_(
+        models.Meeting.room_id == periods.c.room_id,
+        models.Meeting.period.overlaps(func.tstzrange(periods.c.start_time, periods.c.end_time, '[)'))
+    )).limit(1))
+    return query.first()
+
+
+async def create_meeting_series(db: AsyncSession, form_data: CreateMeetingSeries, series_id, creator, periods, events=()):
+    # periods are all occurrences of the series; returns None if any of them is already booked
+    await lock_room(room_id=form_data.room_id, db=db, exclusive=True)
+    start, end = periods[0][0], max(period_end for _, period_end in periods)
+    conflict = await get_meeting_conflict(bookings=[(form_data.room_id, *period) for period in periods], db=db)
+    if conflict is None:
+        for series in await get_series_between(start=start, end=end, room_id=form_data.room_id, db=db):
+            if overlapping(periods, list(occurrences(series, start, end))):
+                conflict = series
+                break
+    if conflict is not None:
+        await db.rollback()
+        return None
+    query = models.MeetingSeries(id=series_id, created_by=creator, ends_at=end, **form_data.model_dump())
+    db.add(query)
+    add_outbox_events(db=db, events=events)
+    await db.commit()
+    return query
 
 
-# ----------------------- INVITATIONS OPERATIONS ------------------------------------
-def get_all_user_invitations(user_id, db: Session):
-    query = db.query(models.Invitation).filter(models.Invitation.user_id == user_id).all()
-    return query
+async def get_series(id, db: AsyncSession):
+    return await db.get(models.MeetingSeries, id)
 
 
-def get_all_meeting_invitations(meeting_id, db: Session):
-    query = db.query(models.Invitation).filter(models.Invitation.meeting_id == meeting_id).all()
-    return query
+async def get_all_user_series(user_id, db: AsyncSession):
+    query = await db.scalars(select(models.MeetingSeries).where(models.MeetingSeries.created_by == user_id)
+                             .order_by(models.MeetingSeries.start_time))
+    return query.all()
 
 
-def create_invitations(db: Session, user_email, meeting_id):
-    query = models.Invitation(user_email=user_email,
-                              meeting_id=meeting_id
-                              )
-    try:
-        db.add(query)
-        db.commit()
-        db.refresh(query)
-    except IntegrityError as e:
-        db.rollback()
+async def delete_own_series(id, user_id, db: AsyncSession):
+    query = await db.execute(delete(models.MeetingSeries).where(models.MeetingSeries.id == id,
+                                                                 models.MeetingSeries.created_by == user_id))
+    await db.commit()
+    return query.rowcount
+
+
+async def cancel_series_occurrence(id, user_id, day, db: AsyncSession):
+    # adds the local day to the exceptions of the series
+    query = await db.execute(update(models.MeetingSeries).where(
+        models.MeetingSeries.id == id, models.MeetingSeries.created_by == user_id
+    ).values(exdates=case(
+        (models.MeetingSeries.exdates.any(day), models.MeetingSeries.exdates),
+        else_=func.array_append(models.MeetingSeries.exdates, day)
+    )))
+    await db.commit()
+    return query.rowcount
+
+
+# ----------------------- INVITATIONS OPERATIONS ------------------------------------
+async def get_all_user_invitations(user_email, db: AsyncSession):
+    query = await db.scalars(select(models.Invitation).where(models.Invitation.user_email == user_email))
+    return query.all()
+
+
+async def get_all_meeting_invitations(meeting_id, db: AsyncSession):
+    query = await db.scalars(select(models.Invitation).where(models.Invitation.meeting_id == meeting_id))
+    return query.all()
+
+
+async def create_invitations(db: AsyncSession, user_emails, meeting_id):
+    # single INSERT for all invitees, already invited emails are skipped.
+    # Runs in the caller's transaction (no commit) and returns the emails actually inserted.
+    user_emails = list(dict.fromkeys(user_emails))
+    if not user_emails:
+        return []
+    query = await db.execute(
+        insert(models.Invitation)
+        .values([{"user_email": user_email, "meeting_id": meeting_id} for user_email in user_emails])
+        .on_conflict_do_nothing(index_elements=[models.Invitation.meeting_id, models.Invitation.user_email])
+        .returning(models.Invitation.user_email)
+    )
+    return query.scalars().all()
+
+
+# ----------------------- OUTBOX OPERATIONS ------------------------------------
+def add_outbox_events(db: AsyncSession, events):
+    # events are (kind, payload) pairs, written by the caller's commit
+    for kind, payload in events:
+        db.add(models.OutboxEvent(kind=kind, payload=payload))
+
+
+async def claim_outbox_events(db: AsyncSession, limit, lease_seconds):
+    # lease due events to this dispatcher: SKIP LOCKED lets several dispatchers
+    # run side by side, and an event whose dispatcher died becomes due again after the lease
+    due = select(models.OutboxEvent.id).where(
+        models.OutboxEvent.status == 'pending',
+        models.OutboxEvent.available_at <= func.now()
+    ).order_by(models.OutboxEvent.available_at).limit(limit).with_for_update(skip_locked=True)
+    query = await db.scalars(
+        update(models.OutboxEvent).where(models.OutboxEvent.id.in_(due.scalar_subquery())).values(
+            attempts=models.OutboxEvent.attempts + 1,
+            available_at=func.now() + timedelta(seconds=lease_seconds)
+        ).returning(models.OutboxEvent).execution_options(synchronize_session=False)
+    )
+    events = query.all()
+    await db.commit()
+    return events
+
+
+async def complete_outbox_event(id, db: AsyncSession):
+    await db.execute(update(models.OutboxEvent).where(models.OutboxEvent.id == id).values(
+        status='done', processed_at=func.now(), last_error=None
+    ))
+    await db.commit()
+
+
+async def purge_outbox_events(older_than, db: AsyncSession):
+    # deletes the events delivered more than older_than (timedelta) ago, returns how many
+    query = await db.execute(delete(models.OutboxEvent).where(
+        models.OutboxEvent.status == 'done',
+        models.OutboxEvent.processed_at < func.now() - older_than
+    ))
+    await db.commit()
+    return query.rowcount
+
+
+async def fail_outbox_event(id, error, retry_in, db: AsyncSession, payload=None):
+    # retry_in is None once the event ran out of attempts, payload replaces the event's for the retry
+    if retry_in is None:
+        values = dict(status='failed', processed_at=func.now(), last_error=error)
     else:
-        return query
+        values = dict(available_at=func.now() + retry_in, last_error=error)
+    if payload is not None:
+        values['payload'] = payload
+    await db.execute(update(models.OutboxEvent).where(models.OutboxEvent.id == id).values(**values))
+    await db.commit()
+
+
+# ----------------------- CHANGE VERSIONS OPERATIONS ------------------------------------
+async def get_change_version(scope, db: AsyncSession):
+    # 0 until the triggers bump the scope for the first time
+    query = await db.scalar(select(models.ChangeVersion.version).where(models.ChangeVersion.scope == scope))
+    return query or 0
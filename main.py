@@ -1,12 +1,42 @@
 import uvicorn
+from contextlib import asynccontextmanager
 # from starlette.middleware.sessions import SessionMiddleware
-from fastapi import FastAPI, status, Request
+from fastapi import FastAPI, Depends, status, Request, Response
 from routers import app_routes, admin_routes, auth_routes
 from fastapi.middleware.cors import CORSMiddleware
+from config.config import OUTBOX_DISPATCHER_ENABLED, CALENDAR_RECONCILER_ENABLED, PG_LISTENER_ENABLED, METRICS_ENABLED, METRICS_TOKEN, DEBUG
+from utils.outbox import outbox_dispatcher
+from utils.http_client import close_http_client
+from utils.bot_requests import telegram_notifier
+from utils.mailer import mailer
+from utils.calendar_sync import calendar_reconciler
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.pg_listener import pg_listener
+from utils import metrics
 # from config.config import SECRET_KEY
 
 
-main_app = FastAPI(title="Book Meeting Room")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # with OUTBOX_DISPATCHER_ENABLED off, run `python -m utils.outbox` as a separate process instead
+    if OUTBOX_DISPATCHER_ENABLED:
+        outbox_dispatcher.start()
+    # off by default, run `python -m utils.calendar_sync` as the single reconciling process
+    if CALENDAR_RECONCILER_ENABLED:
+        calendar_reconciler.start()
+    # without the listener, change versions, rooms, users and roles are read from the database on every request
+    if PG_LISTENER_ENABLED:
+        pg_listener.start()
+    yield
+    await pg_listener.stop()
+    await calendar_reconciler.stop()
+    await outbox_dispatcher.stop()
+    await telegram_notifier.close()
+    await mailer.close()
+    await close_http_client()
+
+
+main_app = FastAPI(title="Book Meeting Room", lifespan=lifespan)
 
 # main_app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
@@ -31,8 +61,19 @@ main_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", metrics.QUERY_COUNT_HEADER, metrics.QUERY_TIME_HEADER],
 )
 
+# added last so it wraps CORS too and measures every response; it also sets the DEBUG query headers
+if METRICS_ENABLED or DEBUG:
+    main_app.add_middleware(metrics.MetricsMiddleware)
+
+if METRICS_ENABLED and METRICS_TOKEN:
+    @main_app.get("/metrics", include_in_schema=False, dependencies=[Depends(metrics.check_scrape_token)])
+    async def get_metrics():
+        body, content_type = metrics.render()
+        return Response(body, media_type=content_type)
+
 
 if __name__ == "__main__":
     uvicorn.run(
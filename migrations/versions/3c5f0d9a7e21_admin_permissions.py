@@ -0,0 +1,35 @@
+"""Admin permissions
+
+Revision ID: 3c5f0d9a7e21
+Revises: 90e20c1cfdb3
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5f0d9a7e21'
+down_revision: Union[str, None] = '90e20c1cfdb3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Admin routes check UserRole.permissions instead of the role name,
+# grant the existing "admin" role everything it could do before.
+ADMIN_PERMISSIONS = ['roles', 'users', 'meetings', 'monitoring']
+
+
+def upgrade() -> None:
+    permissions = ", ".join(f"'{permission}'" for permission in ADMIN_PERMISSIONS)
+    op.execute(
+        f"UPDATE roles SET permissions = ARRAY(SELECT DISTINCT unnest(permissions || ARRAY[{permissions}]::VARCHAR[])) "
+        f"WHERE role = 'admin'"
+    )
+
+
+def downgrade() -> None:
+    # the granted permissions are harmless for the role-name check, keep them
+    pass
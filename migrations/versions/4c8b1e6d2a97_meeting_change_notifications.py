@@ -0,0 +1,82 @@
+"""Meeting change notifications
+
+Revision ID: 4c8b1e6d2a97
+Revises: f2c7d9e4a1b6
+Create Date: 2026-10-18 14:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from config.config import TIMEZONE
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8b1e6d2a97'
+down_revision: Union[str, None] = 'f2c7d9e4a1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # every changed meeting and series is announced on the meeting_changes channel as a JSON delta,
+    # see utils/live_feed.py. Notifications are limited to 8000 bytes, so the description is left
+    # out and the names are cut. date is the local day of start_time (TIMEZONE at migration time),
+    # old_room_id/old_date are set when an update moves the meeting.
+    op.execute(f"""
+        CREATE FUNCTION notify_meeting_change() RETURNS trigger AS $$
+        DECLARE
+            meeting meetings%ROWTYPE;
+            delta jsonb;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                meeting := OLD;
+            ELSE
+                meeting := NEW;
+            END IF;
+            delta := jsonb_build_object(
+                'type', 'meeting', 'op', lower(TG_OP), 'id', meeting.id, 'room_id', meeting.room_id,
+                'date', (meeting.start_time AT TIME ZONE '{TIMEZONE}')::date,
+                'start_time', meeting.start_time, 'end_time', meeting.end_time,
+                'name', left(meeting.name, 500), 'organizer', left(meeting.organizer, 500)
+            );
+            IF TG_OP = 'UPDATE' THEN
+                delta := delta || jsonb_build_object(
+                    'old_room_id', OLD.room_id, 'old_date', (OLD.start_time AT TIME ZONE '{TIMEZONE}')::date
+                );
+            END IF;
+            PERFORM pg_notify('meeting_changes', delta::text);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # a series spans many days, subscribers re-read the room's schedule
+    op.execute("""
+        CREATE FUNCTION notify_meeting_series_change() RETURNS trigger AS $$
+        DECLARE
+            series meeting_series%ROWTYPE;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                series := OLD;
+            ELSE
+                series := NEW;
+            END IF;
+            PERFORM pg_notify('meeting_changes', jsonb_build_object(
+                'type', 'series', 'op', lower(TG_OP), 'id', series.id, 'room_id', series.room_id
+            )::text);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("CREATE TRIGGER notify_meeting_change AFTER INSERT OR UPDATE OR DELETE ON meetings "
+               "FOR EACH ROW EXECUTE FUNCTION notify_meeting_change()")
+    op.execute("CREATE TRIGGER notify_meeting_series_change AFTER INSERT OR UPDATE OR DELETE ON meeting_series "
+               "FOR EACH ROW EXECUTE FUNCTION notify_meeting_series_change()")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER notify_meeting_series_change ON meeting_series")
+    op.execute("DROP TRIGGER notify_meeting_change ON meetings")
+    op.execute("DROP FUNCTION notify_meeting_series_change()")
+    op.execute("DROP FUNCTION notify_meeting_change()")
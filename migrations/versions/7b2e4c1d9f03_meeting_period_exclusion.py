@@ -0,0 +1,60 @@
+"""Meeting period exclusion constraint
+
+Revision ID: 7b2e4c1d9f03
+Revises: 3c5f0d9a7e21
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4c1d9f03'
+down_revision: Union[str, None] = '3c5f0d9a7e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Meetings the constraint would reject, as a readable list; the upgrade stops on them instead of
+# failing with a bare exclusion violation (23P01). Resolve them, e.g. by deleting or moving one meeting
+# of every listed pair, then run the upgrade again.
+def check_bookings():
+    connection = op.get_bind()
+    invalid = connection.execute(sa.text(
+        "SELECT id, start_time, end_time FROM meetings WHERE end_time < start_time ORDER BY id LIMIT 50"
+    )).all()
+    overlapping = connection.execute(sa.text("""
+        SELECT a.room_id, a.id, a.start_time, a.end_time, b.id, b.start_time, b.end_time
+        FROM meetings a JOIN meetings b
+          ON a.room_id = b.room_id AND a.id < b.id AND a.start_time < b.end_time AND b.start_time < a.end_time
+        ORDER BY a.room_id, a.start_time, a.id LIMIT 50
+    """)).all()
+    if not invalid and not overlapping:
+        return
+    lines = [f"meeting {id}: end_time {end} is before start_time {start}" for id, start, end in invalid]
+    lines += [f"room {room_id}: meeting {a_id} ({a_start} - {a_end}) overlaps meeting {b_id} ({b_start} - {b_end})"
+              for room_id, a_id, a_start, a_end, b_id, b_start, b_end in overlapping]
+    raise RuntimeError("Existing bookings conflict with the meetings_room_period_excl constraint "
+                       "(first 50 of each kind shown), delete or move one meeting of each pair and retry:\n"
+                       + "\n".join(lines))
+
+
+def upgrade() -> None:
+    check_bookings()
+    # btree_gist provides the "=" operator class for room_id inside a gist index
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.add_column('meetings', sa.Column('period', postgresql.TSTZRANGE(),
+                                        sa.Computed("tstzrange(start_time, end_time, '[)')", persisted=True),
+                                        nullable=True))
+    op.create_exclude_constraint('meetings_room_period_excl', 'meetings',
+                                 ('room_id', '='), ('period', '&&'),
+                                 using='gist')
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE meetings DROP CONSTRAINT meetings_room_period_excl")
+    op.drop_column('meetings', 'period')
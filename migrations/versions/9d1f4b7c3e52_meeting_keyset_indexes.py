@@ -0,0 +1,31 @@
+"""Meeting keyset pagination indexes
+
+Revision ID: 9d1f4b7c3e52
+Revises: 5a9c2e7f1b38
+Create Date: 2026-10-18 12:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1f4b7c3e52'
+down_revision: Union[str, None] = '5a9c2e7f1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_meetings_start_time_id', 'meetings', ['start_time', 'id'], unique=False)
+    # also serves the created_by foreign key, so the single column index goes
+    op.create_index('ix_meetings_created_by_start_time', 'meetings', ['created_by', 'start_time'], unique=False)
+    op.drop_index(op.f('ix_meetings_created_by'), table_name='meetings')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_meetings_created_by'), 'meetings', ['created_by'], unique=False)
+    op.drop_index('ix_meetings_created_by_start_time', table_name='meetings')
+    op.drop_index('ix_meetings_start_time_id', table_name='meetings')
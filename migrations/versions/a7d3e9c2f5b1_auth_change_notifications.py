@@ -0,0 +1,57 @@
+"""Role and user change notifications
+
+Revision ID: a7d3e9c2f5b1
+Revises: 4c8b1e6d2a97
+Create Date: 2026-10-18 18:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9c2f5b1'
+down_revision: Union[str, None] = '4c8b1e6d2a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # changes of roles and users are announced on the auth_changes channel, so every worker drops
+    # its cached roles ("roles"), a changed or deleted user ("user:<old email>") or all users ("users"),
+    # see utils/cache.py. Deleting a role deletes its users, which notifies for each of them.
+    op.execute("""
+        CREATE FUNCTION notify_roles_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('auth_changes', 'roles');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION notify_user_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                PERFORM pg_notify('auth_changes', 'users');
+            ELSE
+                PERFORM pg_notify('auth_changes', 'user:' || OLD.email);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("CREATE TRIGGER notify_roles_change AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON roles "
+               "FOR EACH STATEMENT EXECUTE FUNCTION notify_roles_change()")
+    op.execute("CREATE TRIGGER notify_user_change AFTER UPDATE OR DELETE ON users "
+               "FOR EACH ROW EXECUTE FUNCTION notify_user_change()")
+    op.execute("CREATE TRIGGER notify_users_truncate AFTER TRUNCATE ON users "
+               "FOR EACH STATEMENT EXECUTE FUNCTION notify_user_change()")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER notify_users_truncate ON users")
+    op.execute("DROP TRIGGER notify_user_change ON users")
+    op.execute("DROP TRIGGER notify_roles_change ON roles")
+    op.execute("DROP FUNCTION notify_user_change()")
+    op.execute("DROP FUNCTION notify_roles_change()")
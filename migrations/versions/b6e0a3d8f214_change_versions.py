@@ -0,0 +1,77 @@
+"""Change versions of rooms and meeting days
+
+Revision ID: b6e0a3d8f214
+Revises: 9d1f4b7c3e52
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config.config import TIMEZONE
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e0a3d8f214'
+down_revision: Union[str, None] = '9d1f4b7c3e52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('change_versions',
+    sa.Column('scope', sa.String(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('scope')
+    )
+    # every bump is announced on the change_versions channel as "<scope>=<version>", see utils/versions.py
+    op.execute("""
+        CREATE FUNCTION bump_change_version(changed_scope text) RETURNS void AS $$
+        DECLARE
+            new_version bigint;
+        BEGIN
+            INSERT INTO change_versions AS cv (scope, version) VALUES (changed_scope, 1)
+            ON CONFLICT (scope) DO UPDATE SET version = cv.version + 1
+            RETURNING cv.version INTO new_version;
+            PERFORM pg_notify('change_versions', changed_scope || '=' || new_version);
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # meetings are versioned per room and local day of start_time (TIMEZONE at migration time),
+    # the scope of GET /app/meetings?room_id=&query_date=
+    op.execute(f"""
+        CREATE FUNCTION meetings_change_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM bump_change_version('meetings:' || OLD.room_id || ':' || (OLD.start_time AT TIME ZONE '{TIMEZONE}')::date);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM bump_change_version('meetings:' || NEW.room_id || ':' || (NEW.start_time AT TIME ZONE '{TIMEZONE}')::date);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION rooms_change_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM bump_change_version('rooms');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("CREATE TRIGGER meetings_change_version AFTER INSERT OR UPDATE OR DELETE ON meetings "
+               "FOR EACH ROW EXECUTE FUNCTION meetings_change_version()")
+    op.execute("CREATE TRIGGER rooms_change_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON rooms "
+               "FOR EACH STATEMENT EXECUTE FUNCTION rooms_change_version()")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER rooms_change_version ON rooms")
+    op.execute("DROP TRIGGER meetings_change_version ON meetings")
+    op.execute("DROP FUNCTION rooms_change_version()")
+    op.execute("DROP FUNCTION meetings_change_version()")
+    op.execute("DROP FUNCTION bump_change_version(text)")
+    op.drop_table('change_versions')
@@ -0,0 +1,32 @@
+"""Meeting lookup indexes
+
+Revision ID: c41a8e5b2d67
+Revises: 7b2e4c1d9f03
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41a8e5b2d67'
+down_revision: Union[str, None] = '7b2e4c1d9f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_meetings_room_id_start_time', 'meetings', ['room_id', 'start_time'], unique=False)
+    op.create_index(op.f('ix_meetings_created_by'), 'meetings', ['created_by'], unique=False)
+    op.create_index(op.f('ix_invitations_meeting_id'), 'invitations', ['meeting_id'], unique=False)
+    op.create_index(op.f('ix_invitations_user_email'), 'invitations', ['user_email'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_invitations_user_email'), table_name='invitations')
+    op.drop_index(op.f('ix_invitations_meeting_id'), table_name='invitations')
+    op.drop_index(op.f('ix_meetings_created_by'), table_name='meetings')
+    op.drop_index('ix_meetings_room_id_start_time', table_name='meetings')
@@ -0,0 +1,136 @@
+"""Meeting day keys from the app.timezone setting
+
+Revision ID: d5f1a8c3e7b2
+Revises: a7d3e9c2f5b1
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from config.config import TIMEZONE
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f1a8c3e7b2'
+down_revision: Union[str, None] = 'a7d3e9c2f5b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the triggers key meetings by their local day in app.timezone instead of the TIMEZONE baked in
+    # at migration time. The app sends its TIMEZONE as app.timezone on every connection (config/db.py),
+    # the database default covers other sessions (psql, scripts)
+    op.execute(f"""
+        DO $$
+        BEGIN
+            EXECUTE format('ALTER DATABASE %I SET app.timezone = %L', current_database(), '{TIMEZONE}');
+        END
+        $$
+    """)
+    # YYYY-MM-DD like date.isoformat() in utils/versions.py and utils/live_feed.py, whatever the DateStyle
+    op.execute("""
+        CREATE FUNCTION meeting_local_day(start_time timestamptz) RETURNS text AS $$
+        DECLARE
+            tz text := nullif(current_setting('app.timezone', true), '');
+        BEGIN
+            IF tz IS NULL THEN
+                RAISE EXCEPTION 'app.timezone is not set, meeting change versions would use the wrong day';
+            END IF;
+            RETURN to_char(start_time AT TIME ZONE tz, 'YYYY-MM-DD');
+        END
+        $$ LANGUAGE plpgsql STABLE
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION meetings_change_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM bump_change_version('meetings:' || OLD.room_id || ':' || meeting_local_day(OLD.start_time));
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM bump_change_version('meetings:' || NEW.room_id || ':' || meeting_local_day(NEW.start_time));
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_meeting_change() RETURNS trigger AS $$
+        DECLARE
+            meeting meetings%ROWTYPE;
+            delta jsonb;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                meeting := OLD;
+            ELSE
+                meeting := NEW;
+            END IF;
+            delta := jsonb_build_object(
+                'type', 'meeting', 'op', lower(TG_OP), 'id', meeting.id, 'room_id', meeting.room_id,
+                'date', meeting_local_day(meeting.start_time),
+                'start_time', meeting.start_time, 'end_time', meeting.end_time,
+                'name', left(meeting.name, 500), 'organizer', left(meeting.organizer, 500)
+            );
+            IF TG_OP = 'UPDATE' THEN
+                delta := delta || jsonb_build_object(
+                    'old_room_id', OLD.room_id, 'old_date', meeting_local_day(OLD.start_time)
+                );
+            END IF;
+            PERFORM pg_notify('meeting_changes', delta::text);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION meetings_change_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM bump_change_version('meetings:' || OLD.room_id || ':' || (OLD.start_time AT TIME ZONE '{TIMEZONE}')::date);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM bump_change_version('meetings:' || NEW.room_id || ':' || (NEW.start_time AT TIME ZONE '{TIMEZONE}')::date);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_meeting_change() RETURNS trigger AS $$
+        DECLARE
+            meeting meetings%ROWTYPE;
+            delta jsonb;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                meeting := OLD;
+            ELSE
+                meeting := NEW;
+            END IF;
+            delta := jsonb_build_object(
+                'type', 'meeting', 'op', lower(TG_OP), 'id', meeting.id, 'room_id', meeting.room_id,
+                'date', (meeting.start_time AT TIME ZONE '{TIMEZONE}')::date,
+                'start_time', meeting.start_time, 'end_time', meeting.end_time,
+                'name', left(meeting.name, 500), 'organizer', left(meeting.organizer, 500)
+            );
+            IF TG_OP = 'UPDATE' THEN
+                delta := delta || jsonb_build_object(
+                    'old_room_id', OLD.room_id, 'old_date', (OLD.start_time AT TIME ZONE '{TIMEZONE}')::date
+                );
+            END IF;
+            PERFORM pg_notify('meeting_changes', delta::text);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP FUNCTION meeting_local_day(timestamptz)")
+    op.execute("""
+        DO $$
+        BEGIN
+            EXECUTE format('ALTER DATABASE %I RESET app.timezone', current_database());
+        END
+        $$
+    """)
@@ -0,0 +1,32 @@
+"""Unique invitations
+
+Revision ID: e8d3f6a1b4c9
+Revises: c41a8e5b2d67
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8d3f6a1b4c9'
+down_revision: Union[str, None] = 'c41a8e5b2d67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keep the first invitation of every (meeting, email) pair
+    op.execute("DELETE FROM invitations a USING invitations b "
+               "WHERE a.meeting_id = b.meeting_id AND a.user_email = b.user_email AND a.id > b.id")
+    op.create_unique_constraint('uq_invitations_meeting_id_user_email', 'invitations', ['meeting_id', 'user_email'])
+    # the unique index leads with meeting_id and replaces it
+    op.drop_index('ix_invitations_meeting_id', table_name='invitations')
+
+
+def downgrade() -> None:
+    op.create_index('ix_invitations_meeting_id', 'invitations', ['meeting_id'], unique=False)
+    op.drop_constraint('uq_invitations_meeting_id_user_email', 'invitations', type_='unique')
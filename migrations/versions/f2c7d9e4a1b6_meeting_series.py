@@ -0,0 +1,68 @@
+"""Recurring meeting series
+
+Revision ID: f2c7d9e4a1b6
+Revises: b6e0a3d8f214
+Create Date: 2026-10-18 14:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7d9e4a1b6'
+down_revision: Union[str, None] = 'b6e0a3d8f214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('meeting_series',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('created_by', sa.String(), nullable=False),
+    sa.Column('organizer', sa.String(), nullable=True),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('end_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('freq', sa.String(), nullable=False),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('exdates', postgresql.ARRAY(sa.Date()), nullable=False),
+    sa.Column('ends_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_meeting_series_room_id_start_time', 'meeting_series', ['room_id', 'start_time'], unique=False)
+    op.create_index(op.f('ix_meeting_series_created_by'), 'meeting_series', ['created_by'], unique=False)
+    # schedule ETags of a room include this version, see utils/versions.py
+    op.execute("""
+        CREATE FUNCTION meeting_series_change_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM bump_change_version('series:' || OLD.room_id);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM bump_change_version('series:' || NEW.room_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("CREATE TRIGGER meeting_series_change_version AFTER INSERT OR UPDATE OR DELETE ON meeting_series "
+               "FOR EACH ROW EXECUTE FUNCTION meeting_series_change_version()")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER meeting_series_change_version ON meeting_series")
+    op.execute("DROP FUNCTION meeting_series_change_version()")
+    op.drop_index(op.f('ix_meeting_series_created_by'), table_name='meeting_series')
+    op.drop_index('ix_meeting_series_room_id_start_time', table_name='meeting_series')
+    op.drop_table('meeting_series')
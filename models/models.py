@@ -1,8 +1,9 @@
-from sqlalchemy import Integer, String, DateTime, JSON, Text, ARRAY
+from sqlalchemy import Integer, BigInteger, String, Date, DateTime, JSON, Text, ARRAY
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
-from sqlalchemy import ForeignKey, Column
+from sqlalchemy import ForeignKey, Column, Computed, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSTZRANGE, ExcludeConstraint
 
 # from ormar import Model, ModelMeta, Integer, String, DateTime, Text, ForeignKey, JSON
 # from config.db import metadata
@@ -48,6 +49,14 @@ class Room(Base):
 
 class Meeting(Base):
     __tablename__ = 'meetings'
+    # a room can't be booked twice for overlapping periods (requires btree_gist)
+    __table_args__ = (
+        ExcludeConstraint(('room_id', '='), ('period', '&&'), name='meetings_room_period_excl', using='gist'),
+        Index('ix_meetings_room_id_start_time', 'room_id', 'start_time'),
+        # keyset pagination order of the meeting lists, see crud.paginate_meetings
+        Index('ix_meetings_start_time_id', 'start_time', 'id'),
+        Index('ix_meetings_created_by_start_time', 'created_by', 'start_time'),
+    )
     id = Column(String, primary_key=True, nullable=False)
     room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False)
     created_by = Column(String, ForeignKey("users.id"), nullable=False)
@@ -57,15 +66,71 @@ class Meeting(Base):
     start_time = Column(DateTime(timezone=True),  nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), default=func.now())
+    period = Column(TSTZRANGE, Computed("tstzrange(start_time, end_time, '[)')", persisted=True))
     room = relationship('Room', back_populates='meeting')
     user = relationship('User', back_populates='meeting')
-    invitation = relationship('Invitation', back_populates='meeting')
+    # never loaded implicitly: queries that need invitees ask for them, see crud.load_invitations
+    invitation = relationship('Invitation', back_populates='meeting', lazy='raise')
 
 
 class Invitation(Base):
     __tablename__ = 'invitations'
+    # also serves lookups by meeting_id, the leading column
+    __table_args__ = (
+        UniqueConstraint('meeting_id', 'user_email', name='uq_invitations_meeting_id_user_email'),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
-    user_email = Column(String, nullable=False)
+    user_email = Column(String, nullable=False, index=True)
     meeting_id = Column(String, ForeignKey("meetings.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), default=func.now())
-    meeting = relationship('Meeting', back_populates='invitation')
\ No newline at end of file
+    meeting = relationship('Meeting', back_populates='invitation')
+
+
+class MeetingSeries(Base):
+    __tablename__ = 'meeting_series'
+    # a recurring meeting stored once, its occurrences are expanded per queried window by utils/recurrence.py
+    __table_args__ = (
+        Index('ix_meeting_series_room_id_start_time', 'room_id', 'start_time'),
+    )
+    id = Column(String, primary_key=True, nullable=False)
+    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False)
+    created_by = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    organizer = Column(String, nullable=True)
+    name = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
+    # first occurrence
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    freq = Column(String, nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    until = Column(DateTime(timezone=True), nullable=True)
+    count = Column(Integer, nullable=True)
+    # local days of cancelled occurrences
+    exdates = Column(ARRAY(Date), nullable=False, default=list)
+    # end of the last occurrence, bounds the series for range lookups
+    ends_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=func.now())
+
+
+class OutboxEvent(Base):
+    __tablename__ = 'outbox'
+    # pending events are claimed in available_at order, see crud.claim_outbox_events
+    __table_args__ = (
+        Index('ix_outbox_pending_available_at', 'available_at', postgresql_where=text("status = 'pending'")),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    created_at = Column(DateTime(timezone=True), default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ChangeVersion(Base):
+    __tablename__ = 'change_versions'
+    # bumped by triggers on rooms and meetings, see migration b6e0a3d8f214 and utils/versions.py
+    scope = Column(String, primary_key=True, nullable=False)
+    version = Column(BigInteger, nullable=False)
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, status, Depends
+from fastapi import APIRouter, status, Depends, Query, Response
 # from starlette.responses import JSONResponse
 # from config.db import SessionLocal
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 # from models.models import UserRole, User
 from schemas.schemas import *
 from crud import crud
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal
+from datetime import date
+from config.db import pool_status
+from config.config import PAGE_SIZE, MAX_PAGE_SIZE
+from utils import export
+from utils.dates import day_bounds
+from utils.pagination import paginate, decode_cursor, meeting_key, user_key, MEETING_CURSOR, USER_CURSOR
 
 # from utils.utils import get_db, get_current_user
-from utils.utils import get_db, get_current_user
+from utils.utils import get_db, get_current_user, require_permission, meeting_list
 
 
 admin_router = APIRouter(
@@ -19,93 +27,63 @@ admin_router = APIRouter(
 
 # --------------------- Actions with ROLES --------------------------
 @admin_router.get("/roles", response_model=List[GetUserRole], status_code=200)
-async def get_roles(db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        return crud.get_all_roles(db=db)
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+async def get_roles(db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("roles"))):
+    return await crud.get_all_roles(db=db)
 
 
 @admin_router.get("/roles/{id}", response_model=GetUserRole, status_code=200)
-async def get_role(id, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        role = crud.get_role(id=id, db=db)
-        if not role:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with the id {id} not found!")
-        return role
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+async def get_role(id: int, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("roles"))):
+    role = await crud.get_role(id=id, db=db)
+    if not role:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with the id {id} not found!")
+    return role
 
 
 @admin_router.post("/roles", response_model=GetUserRole, status_code=201)
-async def create_role(form_data: CreateUserRole, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        created_role = crud.create_role(db=db, form_data=form_data)
-        if not created_role:
-            raise HTTPException(status_code=status.HTTP_302_FOUND, detail="User role with the name already exists!")
-        return created_role
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+async def create_role(form_data: CreateUserRole, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("roles"))):
+    created_role = await crud.create_role(db=db, form_data=form_data)
+    if not created_role:
+        raise HTTPException(status_code=status.HTTP_302_FOUND, detail="User role with the name already exists!")
+    return created_role
 
 
 @admin_router.delete("/roles/{id}", status_code=204)
-async def delete_role(id, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        deleted_role = crud.delete_role(id=id, db=db)
-        if not deleted_role:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User role not found!")
-        return deleted_role
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+async def delete_role(id: int, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("roles"))):
+    deleted_role = await crud.delete_role(id=id, db=db)
+    if not deleted_role:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User role not found!")
+    return deleted_role
 
 
 @admin_router.put("/roles/{id}", status_code=202)
-async def update_role(id, role: CreateUserRole, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        updated_role = crud.update_role(db=db, id=id, role=role)
-        if not updated_role:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User role with the id not found!")
+async def update_role(id: int, role: CreateUserRole, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("roles"))):
+    updated_role = await crud.update_role(db=db, id=id, role=role)
+    if not updated_role:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User role with the id not found!")
 
-        return updated_role
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+    return updated_role
 
 
 # ----------------------- Actions with ROOMS ------------------------
 @admin_router.get("/rooms", response_model=List[GetRoom], status_code=200)
-async def get_rooms(db: Session = Depends(get_db)):  # current_user: GetUser = Depends(get_current_user)
+async def get_rooms(db: AsyncSession = Depends(get_db)):  # current_user: GetUser = Depends(get_current_user)
     # role_id = current_user.role_id
     # if not role_id:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
     # role_name = crud.get_role(role_id, db).role
     # if role_name == "admin":
-    return crud.get_all_rooms(db=db)
+    return await crud.get_all_rooms(db=db)
     # raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
 
 
 @admin_router.get("/rooms/{id}", response_model=GetRoom, status_code=200)
-async def get_room(id, db: Session = Depends(get_db)):  # current_user: GetUser = Depends(get_current_user)
+async def get_room(id: int, db: AsyncSession = Depends(get_db)):  # current_user: GetUser = Depends(get_current_user)
     # role_id = current_user.role_id
     # if not role_id:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
     # role_name = crud.get_role(role_id, db).role
     # if role_name == "admin":
-    room = crud.get_room(id=id, db=db)
+    room = await crud.get_room(id=id, db=db)
     if not room:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Room with the id {id} not found!")
     return room
@@ -113,13 +91,13 @@ async def get_room(id, db: Session = Depends(get_db)):  # current_user: GetUser
 
 
 @admin_router.post("/rooms", response_model=CreateRoom, status_code=201)
-async def create_room(form_data: CreateRoom, db: Session = Depends(get_db)):  # current_user: GetUser = Depends(get_current_user)
+async def create_room(form_data: CreateRoom, db: AsyncSession = Depends(get_db)):  # current_user: GetUser = Depends(get_current_user)
     # role_id = current_user.role_id
     # if not role_id:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
     # role_name = crud.get_role(role_id, db).role
     # if role_name == "admin":
-    created_room = crud.create_room(db=db, form_data=form_data)
+    created_room = await crud.create_room(db=db, form_data=form_data)
     if not created_room:
         raise HTTPException(status_code=status.HTTP_302_FOUND, detail="The room with the name already exists!")
     return created_room
@@ -127,8 +105,8 @@ async def create_room(form_data: CreateRoom, db: Session = Depends(get_db)):  #
 
 
 @admin_router.put("/rooms/{id}", status_code=202)
-async def update_room(id, room: CreateRoom, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    updated_room = crud.update_room(id=id, room=room, db=db)
+async def update_room(id: int, room: CreateRoom, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    updated_room = await crud.update_room(id=id, room=room, db=db)
     if not updated_room:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found!!")
 
@@ -138,52 +116,52 @@ async def update_room(id, room: CreateRoom, db: Session = Depends(get_db), curre
 
 # --------------------- Actions with USERS --------------------------
 @admin_router.get("/users", response_model=List[GetUser], status_code=200)
-async def get_users(db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        return crud.get_all_users(db=db)
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+async def get_users(response: Response, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                    db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("users"))):
+    users = await crud.get_all_users(db=db, limit=limit, after=decode_cursor(cursor, USER_CURSOR))
+    return paginate(users, limit, response, user_key)
 
 
 @admin_router.get("/users/{id}", response_model=GetUser, status_code=200)
-def get_user(id, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        user = crud.get_user(id=id, db=db)
-        if not user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with the id {id} not found!")
-        return user
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+async def get_user(id, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("users"))):
+    user = await crud.get_user(id=id, db=db)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with the id {id} not found!")
+    return user
 
 
 # --------------------- Actions with MEETINGS --------------------------
 @admin_router.get("/meetings", response_model=List[GetMeeting], status_code=200)
-async def get_meetings(db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        return crud.get_all_meetings(db=db)
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+async def get_meetings(response: Response, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                       start: Optional[datetime] = None, end: Optional[datetime] = None, with_invitations: bool = True,
+                       db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("meetings"))):
+    meetings = await crud.get_all_meetings(db=db, limit=limit, after=decode_cursor(cursor, MEETING_CURSOR), start=start, end=end,
+                                           with_invitations=with_invitations)
+    return meeting_list(paginate(meetings, limit, response, meeting_key), with_invitations)
+
+
+# Streams the meetings starting in [start_date, end_date] (local days) as NDJSON or CSV,
+# with_details adds the room name and the invitees
+@admin_router.get("/meetings/export", status_code=200)
+async def export_meetings(format: Literal["ndjson", "csv"] = "ndjson", start_date: Optional[date] = None,
+                          end_date: Optional[date] = None, room_id: Optional[int] = None, with_details: bool = False,
+                          current_user: GetUser = Depends(require_permission("meetings"))):
+    start = day_bounds(start_date)[0] if start_date else None
+    end = day_bounds(end_date)[1] if end_date else None
+    return StreamingResponse(export.export_meetings(format, start=start, end=end, room_id=room_id, with_details=with_details),
+                             media_type=export.MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="meetings.{format}"'})
 
 
 @admin_router.get("/meetings/{id}", response_model=GetMeeting, status_code=200)
-def get_meeting(id: str, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    role_id = current_user.role_id
-    if not role_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
-    role_name = crud.get_role(role_id, db).role
-    if role_name == "admin":
-        meeting = crud.get_meeting(id=id, db=db)
-        if not meeting:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Meeting with the id {id} not found!")
-        return meeting
-    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
+async def get_meeting(id: str, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(require_permission("meetings"))):
+    meeting = await crud.get_meeting(id=id, db=db)
+    if not meeting:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Meeting with the id {id} not found!")
+    return meeting
 
+
+# --------------------- DATABASE POOL --------------------------
+@admin_router.get("/db-pool", response_model=PoolStatus, status_code=200)
+async def get_pool_status(current_user: GetUser = Depends(require_permission("monitoring"))):
+    return pool_status()
@@ -1,104 +1,195 @@
-from fastapi import APIRouter, Depends, Response, status, HTTPException
-from sqlalchemy import cast, Date, Time
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException, Query, WebSocket
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import JSONResponse
 # from bson import json_util
-import json
 import uuid
 from schemas.schemas import *
 from crud import crud
-from utils.bot_requests import send_to_chat
-from utils.utils import get_db, get_current_user, email_sender
-from utils.google_calendar import get_events, create_event, delete_event
-from datetime import datetime, date
-from config.config import BOT_TOKEN, CHANNEL_ID
+from utils.bot_requests import MAX_MESSAGE_LENGTH
+from utils.utils import get_db, get_current_user, meeting_list
+from config.db import AsyncSessionLocal
+from utils.outbox import outbox_dispatcher, CALENDAR_CREATE, CALENDAR_DELETE, TELEGRAM_SEND, EMAIL_INVITE
+from utils.mailer import mailer
+from utils.pagination import paginate, decode_cursor, meeting_key, user_key, MEETING_CURSOR, USER_CURSOR
+from utils.versions import change_versions, not_modified, meetings_scope, series_scope, ROOMS_SCOPE
+from utils.recurrence import occurrences
+from utils.dates import day_bounds, LOCAL_TZ
+from utils.availability import working_windows, free_slots
+from utils import live_feed, metrics
+from utils.metrics import BOOKING_CONFLICTS
+from datetime import datetime, date, timedelta
+from itertools import groupby, islice
+from config.config import BOT_TOKEN, CHANNEL_ID, PAGE_SIZE, MAX_PAGE_SIZE, RECURRENCE_MAX_OCCURRENCES, SCHEDULE_MAX_DAYS, \
+    AVAILABILITY_MAX_DAYS
 
 
 app_router = APIRouter(
     prefix='/app',
     tags=['app']
 )
+BOOKING_CONFLICT_DETAIL = "Конференц зал уже забронирован в указанном периоде времени!"
+SERIES_FREQUENCIES = {"daily": "ежедневно", "weekly": "еженедельно", "monthly": "ежемесячно"}
 
 
 # ----------------------- Actions with USERS ------------------------
 @app_router.get("/users", response_model=List[GetUser], status_code=200)
-async def get_users(db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    return crud.get_all_users(db=db)
+async def get_users(response: Response, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                    db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    users = await crud.get_all_users(db=db, limit=limit, after=decode_cursor(cursor, USER_CURSOR))
+    return paginate(users, limit, response, user_key)
 
 
 # ----------------------- Actions with ROOMS ------------------------
+# Room and schedule reads carry an ETag of the data's change version, see utils/versions.py;
+# a poll with a matching If-None-Match gets 304 before anything is queried
 @app_router.get("/rooms", response_model=List[GetRoom], status_code=200)
-async def get_rooms(db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    return crud.get_all_rooms(db=db)
+async def get_rooms(request: Request, response: Response, db: AsyncSession = Depends(get_db),
+                    current_user: GetUser = Depends(get_current_user)):
+    etag = await change_versions.etag(ROOMS_SCOPE, db)
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return await crud.get_all_rooms(db=db)
 
 
 @app_router.get("/rooms/{id}", response_model=GetRoom, status_code=200)
-async def get_room(id: int, response: Response, db: Session = Depends(get_db),
+async def get_room(id: int, response: Response, db: AsyncSession = Depends(get_db),
                    current_user: GetUser = Depends(get_current_user)):
-    room = crud.get_room(id=id, db=db)
+    room = await crud.get_room(id=id, db=db)
     if not room:
         response.status_code = status.HTTP_404_NOT_FOUND
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room with the id not found!")
     return room
 
 
+# ------------------- Free / busy for ALL ROOMS ----------------------
+@app_router.get("/availability", response_model=List[RoomAvailability], status_code=200)
+async def get_availability(start_date: date, end_date: Optional[date] = None, min_duration: int = Query(0, ge=0),
+                           db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    # min_duration is in minutes, end_date defaults to start_date
+    end_date = end_date or start_date
+    if end_date < start_date or (end_date - start_date).days >= AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"end_date must be within {AVAILABILITY_MAX_DAYS} days after start_date!")
+    windows = working_windows(start_date, end_date)
+    rows = await crud.get_busy_periods(start=windows[0][0], end=windows[-1][1], db=db)
+    busy = {room_id: [(row.start_time, row.end_time) for row in room_rows]
+            for room_id, room_rows in groupby(rows, key=lambda row: row.room_id)}
+    for series in await crud.get_series_between(start=windows[0][0], end=windows[-1][1], db=db):
+        busy.setdefault(series.room_id, []).extend(occurrences(series, windows[0][0], windows[-1][1]))
+        busy[series.room_id].sort()
+    min_duration = timedelta(minutes=min_duration)
+    return [
+        RoomAvailability(room_id=room.id, name=room.name,
+                         free_slots=[FreeSlot(start_time=start, end_time=end)
+                                     for start, end in free_slots(busy.get(room.id, []), windows, min_duration)])
+        for room in await crud.get_all_rooms(db=db)
+    ]
+
+
+# ------------------- Schedule grid of ROOMS x DAYS ----------------------
+# The meetings (and series occurrences) of the rooms (all when room_id is not given) starting
+# in [start_date, end_date], grouped by room and local day as columns, for week views
+@app_router.get("/schedule", response_model=List[RoomSchedule], status_code=200)
+async def get_schedule(start_date: date, end_date: date, room_id: List[int] = Query([]),
+                       db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    if end_date < start_date or (end_date - start_date).days >= SCHEDULE_MAX_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"end_date must be within {SCHEDULE_MAX_DAYS} days after start_date!")
+    rooms = [room for room in await crud.get_all_rooms(db=db) if not room_id or room.id in room_id]
+    room_ids = {room.id for room in rooms}
+    start, end = day_bounds(start_date)[0], day_bounds(end_date)[1]
+    meetings = {room: [(row.id, row.start_time, row.end_time, row.name, row.organizer) for row in rows]
+                for room, rows in groupby(await crud.get_schedule(start=start, end=end, room_ids=room_id, db=db),
+                                          key=lambda row: row.room_id)}
+    for series in await crud.get_series_between(start=start, end=end, db=db):
+        if series.room_id in room_ids:
+            meetings.setdefault(series.room_id, []).extend(
+                (f"{series.id}_{occurrence_start:%Y%m%d}", occurrence_start, occurrence_end, series.name, series.organizer)
+                for occurrence_start, occurrence_end in occurrences(series, start, end) if occurrence_start >= start
+            )
+            meetings[series.room_id].sort(key=lambda meeting: meeting[1])
+    grid = []
+    for room in rooms:
+        days = []
+        for day, day_meetings in groupby(meetings.get(room.id, []),
+                                         key=lambda meeting: meeting[1].astimezone(LOCAL_TZ).date()):
+            ids, starts, ends, names, organizers = zip(*day_meetings)
+            days.append(ScheduleDay(date=day, ids=ids, starts=starts, ends=ends, names=names, organizers=organizers))
+        grid.append(RoomSchedule(room_id=room.id, name=room.name, days=days))
+    return grid
+
+
 # --------------------- Actions with MEETINGS --------------------------
+# Meeting lists are pages of meetings starting in [start, end), see utils/pagination.py.
+# with_invitations=false skips loading the invitees, which are then returned as null
 @app_router.get("/all_meetings", response_model=List[GetMeeting], status_code=200)
-def get_all_meetings_of_room(room_id: int, db: Session = Depends(get_db),
-                             current_user: GetUser = Depends(get_current_user)):
-    all_meetings = crud.get_all_meetings_of_room(room_id=room_id, db=db)
+async def get_all_meetings_of_room(room_id: int, response: Response, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                   cursor: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                   with_invitations: bool = True,
+                                   db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    all_meetings = await crud.get_all_meetings_of_room(room_id=room_id, db=db, limit=limit,
+                                                       after=decode_cursor(cursor, MEETING_CURSOR), start=start, end=end,
+                                                       with_invitations=with_invitations)
     if not all_meetings:
         return JSONResponse([])
-    return all_meetings
+    return meeting_list(paginate(all_meetings, limit, response, meeting_key), with_invitations)
 
 
 @app_router.get("/meetings", response_model=List[GetMeeting], status_code=200)
-def get_meetings_of_room_by_date(room_id: int, query_date: date, db: Session = Depends(get_db),
-                                 current_user: GetUser = Depends(get_current_user)):
-    specific_meetings = crud.get_all_meetings_of_room_by_date(room_id=room_id, date=query_date, db=db)
+async def get_meetings_of_room_by_date(room_id: int, query_date: date, request: Request, response: Response,
+                                       with_invitations: bool = True, db: AsyncSession = Depends(get_db),
+                                       current_user: GetUser = Depends(get_current_user)):
+    etag = await change_versions.etag(meetings_scope(room_id, query_date), db, with_invitations,
+                                      await change_versions.get(series_scope(room_id), db))
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    specific_meetings = await crud.get_all_meetings_of_room_by_date(room_id=room_id, date=query_date, db=db,
+                                                                    with_invitations=with_invitations)
+    # occurrences of recurring meetings held on the day
+    day_start, day_end = day_bounds(query_date)
+    recurring = [occurrence for series in await crud.get_series_between(start=day_start, end=day_end, room_id=room_id, db=db)
+                 for occurrence in series_occurrences(series, day_start, day_end) if occurrence.end_time <= day_end
+                 and occurrence.start_time >= day_start]
+    if recurring:
+        specific_meetings = sorted([*specific_meetings, *recurring], key=lambda meeting: meeting.start_time)
     if not specific_meetings:
         # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Planed meetings not found!")
-        return JSONResponse([])
-    return specific_meetings
+        return JSONResponse([], headers={"ETag": etag})
+    return meeting_list(specific_meetings, with_invitations)
 
 
 @app_router.get("/meetings/{id}", response_model=GetMeeting, status_code=200)
-async def get_meeting(id: str, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    meeting = crud.get_meeting(id=id, db=db)
+async def get_meeting(id: str, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    meeting = await crud.get_meeting(id=id, db=db)
     if not meeting:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meeting with the id not found!")
-    # invited_users = crud.get_all_meeting_invitations(meeting_id=id, db=db)
-    # email_list = [email.user_email for email in invited_users]
     return meeting
 
 
 @app_router.get("/my-meetings", response_model=List[GetMeeting])
-async def get_own_meetings(db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):  # user_id: int,
-    return crud.get_all_user_meetings(user_id=current_user.id, db=db)
+async def get_own_meetings(response: Response, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                           start: Optional[datetime] = None, end: Optional[datetime] = None, with_invitations: bool = True,
+                           db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):  # user_id: int,
+    meetings = await crud.get_all_user_meetings(user_id=current_user.id, db=db, limit=limit,
+                                                after=decode_cursor(cursor, MEETING_CURSOR), start=start, end=end,
+                                                with_invitations=with_invitations)
+    return meeting_list(paginate(meetings, limit, response, meeting_key), with_invitations)
 
 
 @app_router.post("/meetings", response_model=CreateMeeting, status_code=201)
-async def create_meeting(form_data: CreateMeeting, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    existed_meeting = crud.check_meeting(db=db, form_data=form_data)
-    if existed_meeting:
-        raise HTTPException(status_code=status.HTTP_302_FOUND, detail="Конференц зал уже забронирован в указанном периоде времени!")
+async def create_meeting(form_data: CreateMeeting, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    room = await crud.get_room(id=form_data.room_id, db=db)
+    if not room:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room with the id not found!")
     meeting_id = uuid.uuid4().hex
-    created_meeting = crud.create_meeting(db=db, form_data=form_data, meeting_id=meeting_id, creator=current_user.id)
-    google_token = current_user.google_token
-    email_receivers = []
-    if form_data.invited_users:
-        for user_email in form_data.invited_users:
-            created_invitation = crud.create_invitations(db=db, user_email=user_email, meeting_id=created_meeting.id)
-            if not created_invitation:
-                continue
-            email_receivers.append({"email": user_email})
-
-    # there will be created google calendar event
-    room = crud.get_room(id=form_data.room_id, db=db).name
-    organizer = created_meeting.organizer
-    title = created_meeting.description
-    start_time = created_meeting.start_time
-    end_time = created_meeting.end_time
+
+    # google calendar event and telegram message are sent by the outbox dispatcher after commit
+    room = room.name
+    organizer = form_data.organizer
+    start_time = form_data.start_time
+    end_time = form_data.end_time
     # message_text = (f"You were invited to meeting {title} organized by {organizer}.\n"
     #                 f"Meeting get place in {room} at {start_time.split(sep='.')[0]} and "
     #                 f"continue until {end_time.split(sep='.')[0]}")
@@ -108,33 +199,181 @@ async def create_meeting(form_data: CreateMeeting, db: Session = Depends(get_db)
     message_text = (f"Уважаемые коллеги!\n\n{meeting_date} с {meeting_start_time} до {meeting_end_time}"
                     f" {room} будет забронирована✅.\n\n"
                     f"Забронировал: {organizer}")
-    # await email_sender(receivers=email_receivers, organizer=created_meeting.organizer, room=room,
-    #                    meeting_name=meeting_name, start_time=start_time, end_time=end_time)
-    await create_event(google_token=google_token, id=meeting_id, organizer=organizer, room=room, title=title,
-                       start_time=start_time, end_time=end_time, guests=email_receivers, message_text=message_text)
-    await send_to_chat(bot_token=BOT_TOKEN, chat_id=CHANNEL_ID, message_text=message_text)
+    events = [
+        (CALENDAR_CREATE, {"meeting_id": meeting_id, "message_text": message_text}),
+        (TELEGRAM_SEND, {"chat_id": CHANNEL_ID, "text": message_text}),
+    ]
+    # emailed to the newly invited users only, crud adds them as the receivers
+    invitation_event = None
+    if mailer.enabled:
+        invitation_event = (EMAIL_INVITE, {"meeting_id": meeting_id, "start_time": f"{meeting_date} {meeting_start_time}",
+                                           "end_time": f"{meeting_end_time}"})
+    created = await crud.create_meeting(db=db, form_data=form_data, meeting_id=meeting_id, creator=current_user.id,
+                                        events=events, invitation_event=invitation_event)
+    if not created:
+        BOOKING_CONFLICTS.labels(metrics.MEETING).inc()
+        raise HTTPException(status_code=status.HTTP_302_FOUND, detail=BOOKING_CONFLICT_DETAIL)
+    created_meeting, _ = created
+    outbox_dispatcher.wake()
 
     return created_meeting
 
 
+# Books all the meetings or none of them, with one Telegram message for the whole batch
+@app_router.post("/meetings/batch", response_model=List[CreateMeeting], status_code=201)
+async def create_meetings(form_data: CreateMeetingBatch, db: AsyncSession = Depends(get_db),
+                          current_user: GetUser = Depends(get_current_user)):
+    rooms = {room.id: room.name for room in await crud.get_all_rooms(db=db)}
+    missing = sorted({meeting.room_id for meeting in form_data.meetings} - rooms.keys())
+    if missing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Rooms with the ids {missing} not found!")
+    meetings = [(uuid.uuid4().hex, meeting) for meeting in form_data.meetings]
+    events = []
+    invitation_events = {}
+    lines = []
+    for meeting_id, meeting in meetings:
+        meeting_date = meeting.start_time.date().strftime("%d/%m/%Y")
+        meeting_start_time = meeting.start_time.time().strftime("%H:%M")
+        meeting_end_time = meeting.end_time.time().strftime("%H:%M")
+        line = f"{meeting_date} с {meeting_start_time} до {meeting_end_time} {rooms[meeting.room_id]}"
+        lines.append(line)
+        events.append((CALENDAR_CREATE, {"meeting_id": meeting_id,
+                                         "message_text": f"Уважаемые коллеги!\n\n{line} будет забронирована✅.\n\n"
+                                                         f"Забронировал: {meeting.organizer}"}))
+        if meeting.invited_users and mailer.enabled:
+            invitation_events[meeting_id] = (EMAIL_INVITE, {"meeting_id": meeting_id,
+                                                            "start_time": f"{meeting_date} {meeting_start_time}",
+                                                            "end_time": f"{meeting_end_time}"})
+    organizers = ", ".join(dict.fromkeys(meeting.organizer for _, meeting in meetings if meeting.organizer))
+    for text in batch_messages(lines, f"\n\nЗабронировал: {organizers}"):
+        events.append((TELEGRAM_SEND, {"chat_id": CHANNEL_ID, "text": text}))
+    created = await crud.create_meetings(db=db, meetings=meetings, creator=current_user.id, events=events,
+                                         invitation_events=invitation_events)
+    if not created:
+        BOOKING_CONFLICTS.labels(metrics.BATCH).inc()
+        raise HTTPException(status_code=status.HTTP_302_FOUND, detail=BOOKING_CONFLICT_DETAIL)
+    outbox_dispatcher.wake()
+    return created
+
+
+def batch_messages(lines, footer):
+    # the booked periods as few Telegram messages as the length limit allows
+    header = "Уважаемые коллеги!\n\nБудут забронированы✅:\n"
+    texts = [[]]
+    length = len(header) + len(footer)
+    for line in lines:
+        if texts[-1] and length + len(line) + 1 > MAX_MESSAGE_LENGTH:
+            texts.append([])
+            length = len(header) + len(footer)
+        texts[-1].append(line)
+        length += len(line) + 1
+    return [header + "\n".join(text) + footer for text in texts]
+
+
 @app_router.delete("/meetings/{id}", status_code=204)
-async def delete_meeting(id, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    deleted_meeting = crud.delete_own_meeting(id=id, user_id=current_user.id, db=db)
+async def delete_meeting(id, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    events = [(CALENDAR_DELETE, {"meeting_id": id, "user_id": current_user.id})]
+    deleted_meeting = await crud.delete_own_meeting(id=id, user_id=current_user.id, db=db, events=events)
     if not deleted_meeting:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meeting not found or not have permission!")
-    await delete_event(id=deleted_meeting.id, google_token=current_user.google_token)
+    outbox_dispatcher.wake()
     return deleted_meeting
 
 
 @app_router.put("/meetings/{id}", status_code=202)
-async def update_meeting(id, meeting: CreateMeeting, db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
-    updated_meeting = crud.update_meeting(id=id, meeting=meeting, db=db)
+async def update_meeting(id, meeting: CreateMeeting, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    updated_meeting = await crud.update_meeting(id=id, meeting=meeting, db=db)
+    if updated_meeting is None:
+        BOOKING_CONFLICTS.labels(metrics.UPDATE).inc()
+        raise HTTPException(status_code=status.HTTP_302_FOUND, detail=BOOKING_CONFLICT_DETAIL)
     if not updated_meeting:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meeting not found!!")
 
     return updated_meeting
 
 
+# ----------------- Actions with MEETING SERIES -----------------------
+# Occurrences of a series as meetings, their id is the series id and the local day
+def series_occurrences(series, start, end):
+    return [GetMeeting(id=f"{series.id}_{occurrence_start:%Y%m%d}", room_id=series.room_id, created_by=series.created_by,
+                       organizer=series.organizer, name=series.name, description=series.description,
+                       start_time=occurrence_start, end_time=occurrence_end, series_id=series.id)
+            for occurrence_start, occurrence_end in occurrences(series, start, end)]
+
+
+@app_router.post("/series", response_model=GetMeetingSeries, status_code=201)
+async def create_meeting_series(form_data: CreateMeetingSeries, db: AsyncSession = Depends(get_db),
+                                current_user: GetUser = Depends(get_current_user)):
+    room = await crud.get_room(id=form_data.room_id, db=db)
+    if not room:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room with the id not found!")
+    periods = list(islice(occurrences(form_data), RECURRENCE_MAX_OCCURRENCES + 1))
+    if not periods or len(periods) > RECURRENCE_MAX_OCCURRENCES:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                            detail=f"A series must have between 1 and {RECURRENCE_MAX_OCCURRENCES} occurrences!")
+    series_id = uuid.uuid4().hex
+    first_start, first_end = periods[0]
+    message_text = (f"Уважаемые коллеги!\n\n{room.name} будет забронирована✅ {SERIES_FREQUENCIES[form_data.freq]}"
+                    f" с {first_start:%H:%M} до {first_end:%H:%M}, начиная с {first_start:%d/%m/%Y}"
+                    f" ({len(periods)} раз).\n\n"
+                    f"Забронировал: {form_data.organizer}")
+    events = [(TELEGRAM_SEND, {"chat_id": CHANNEL_ID, "text": message_text})]
+    created = await crud.create_meeting_series(db=db, form_data=form_data, series_id=series_id, creator=current_user.id,
+                                               periods=periods, events=events)
+    if not created:
+        BOOKING_CONFLICTS.labels(metrics.SERIES).inc()
+        raise HTTPException(status_code=status.HTTP_302_FOUND, detail=BOOKING_CONFLICT_DETAIL)
+    outbox_dispatcher.wake()
+    return created
+
+
+@app_router.get("/series", response_model=List[GetMeetingSeries], status_code=200)
+async def get_own_series(db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    return await crud.get_all_user_series(user_id=current_user.id, db=db)
+
+
+@app_router.get("/series/{id}/occurrences", response_model=List[GetMeeting], status_code=200)
+async def get_series_occurrences(id: str, start_date: date, end_date: date, db: AsyncSession = Depends(get_db),
+                                 current_user: GetUser = Depends(get_current_user)):
+    series = await crud.get_series(id=id, db=db)
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meeting series with the id not found!")
+    return series_occurrences(series, day_bounds(start_date)[0], day_bounds(end_date)[1])
+
+
+@app_router.delete("/series/{id}", status_code=204)
+async def delete_meeting_series(id: str, db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):
+    deleted_series = await crud.delete_own_series(id=id, user_id=current_user.id, db=db)
+    if not deleted_series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meeting series not found or not have permission!")
+
+
+# Cancels the occurrence held on the given local day
+@app_router.delete("/series/{id}/occurrences/{day}", status_code=204)
+async def cancel_series_occurrence(id: str, day: date, db: AsyncSession = Depends(get_db),
+                                   current_user: GetUser = Depends(get_current_user)):
+    cancelled = await crud.cancel_series_occurrence(id=id, user_id=current_user.id, day=day, db=db)
+    if not cancelled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meeting series not found or not have permission!")
+
+
+# ----------------- LIVE meeting changes -----------------------
+# Pushes the meeting changes of the given rooms/local days (all when empty) instead of polling
+# /app/meetings, see utils/live_feed.py. Browsers can't set headers on a WebSocket, so the JWT
+# comes as ?token=
+@app_router.websocket("/live")
+async def live_meetings(websocket: WebSocket, token: str, room_id: List[int] = Query([]), day: List[date] = Query([])):
+    # the session is closed before the connection is served, a long-lived client holds no pool connection
+    async with AsyncSessionLocal() as db:
+        try:
+            await get_current_user(token=token, db=db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    await websocket.accept()
+    await live_feed.serve(websocket, room_ids=room_id, dates=day)
+
+
 # ----------------- Actions with INVITATIONS -----------------------
 # @app_router.post("/invitations", response_model=CreateInvitation, status_code=201)
 # async def create_invitation(form_data: CreateInvitation, db: Session = Depends(get_db),
@@ -155,5 +394,5 @@ async def update_meeting(id, meeting: CreateMeeting, db: Session = Depends(get_d
 
 
 @app_router.get("/invitations", response_model=List[GetInvitation])
-async def get_invitations(db: Session = Depends(get_db), current_user: GetUser = Depends(get_current_user)):  # user_id: int
-    return crud.get_all_user_invitations(user_id=current_user.id, db=db)
+async def get_invitations(db: AsyncSession = Depends(get_db), current_user: GetUser = Depends(get_current_user)):  # user_id: int
+    return await crud.get_all_user_invitations(user_email=current_user.email, db=db)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Request, status, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.templating import Jinja2Templates
 # from routers.settings import oauth, FRONTEND_URL
 from starlette.responses import RedirectResponse, JSONResponse, HTMLResponse
@@ -8,7 +8,8 @@ from crud import crud
 # from routers.settings import oauth
 from schemas.schemas import Token, GoogleToken
 from utils.utils import get_db, create_token, CREDENTIALS_EXCEPTION
-import requests
+from utils.http_client import request
+from config.config import GOOGLE_API_URL
 
 
 auth_router = APIRouter(
@@ -44,12 +45,12 @@ templates = Jinja2Templates(directory="templates")
 
 
 @auth_router.post("/login", status_code=status.HTTP_200_OK, response_model=Token)
-async def auth(google_token: GoogleToken, db: Session = Depends(get_db)):
-    user_info = requests.get(f"https://www.googleapis.com/oauth2/v1/userinfo?alt=json&access_token={google_token.token}")
+async def auth(google_token: GoogleToken, db: AsyncSession = Depends(get_db)):
+    user_info = await request("GET", f"{GOOGLE_API_URL}/oauth2/v1/userinfo?alt=json&access_token={google_token.token}")
     user_dict = user_info.json()
     user_dict["google_token"] = google_token.token
     # user_obj = crud.get_or_create_user(db=db, form_data=user_dict)
-    crud.get_or_create_user(db=db, form_data=user_dict)
+    await crud.get_or_create_user(db=db, form_data=user_dict)
     # if user_obj:
     jwt_token = create_token(user_dict['email'])
     return JSONResponse({'email': user_dict['email'], 'jwt_token': jwt_token, "token_type": "Bearer"})
@@ -1,10 +1,12 @@
 import re
-from datetime import datetime
-from typing import List, Optional, Union
+from datetime import date, datetime
+from typing import List, Literal, Optional, Union
 
 from fastapi.params import Form
-from pydantic import BaseModel, ConfigDict, EmailStr
-from config.config import SECRET_KEY
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator, model_validator
+from config.config import SECRET_KEY, BATCH_MAX_MEETINGS
+from utils.dates import as_local
+from utils.recurrence import MIN_STEP
 
 
 # pattern = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
@@ -74,6 +76,21 @@ class GetMeeting(TunedModel):
     end_time: Optional[datetime]
     # invitation: Optional[List[GetInvitationList]] = None
     invitation: Optional[List[GetInvitation]] = None
+    # set on occurrences of a recurring meeting
+    series_id: Optional[str] = None
+
+
+# GetMeeting without invitees, for lists requested with with_invitations=false
+class GetMeetingSummary(TunedModel):
+    id: Optional[str]
+    room_id: int
+    created_by: Optional[str] = None
+    organizer: Optional[str] = None
+    name: Optional[str]
+    description: Optional[str]
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    series_id: Optional[str] = None
 
 
 class CreateMeeting(BaseModel):
@@ -87,6 +104,58 @@ class CreateMeeting(BaseModel):
     start_time: datetime
     end_time: datetime
 
+    @field_validator('start_time', 'end_time')
+    @classmethod
+    def attach_timezone(cls, value):
+        return as_local(value)
+
+    @model_validator(mode='after')
+    def check_period(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
+
+
+# Meetings booked together, all or none; they must not overlap each other
+class CreateMeetingBatch(BaseModel):
+    meetings: List[CreateMeeting] = Field(min_length=1, max_length=BATCH_MAX_MEETINGS)
+
+    @model_validator(mode='after')
+    def check_overlaps(self):
+        periods = sorted((meeting.room_id, meeting.start_time, meeting.end_time, index)
+                         for index, meeting in enumerate(self.meetings))
+        for previous, current in zip(periods, periods[1:]):
+            if previous[0] == current[0] and current[1] < previous[2]:
+                raise ValueError(f"meetings {previous[3]} and {current[3]} overlap")
+        return self
+
+
+class FreeSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class RoomAvailability(BaseModel):
+    room_id: int
+    name: str
+    free_slots: List[FreeSlot]
+
+
+# Meetings of one room and local day as parallel arrays, ordered by start_time
+class ScheduleDay(BaseModel):
+    date: date
+    ids: List[str]
+    starts: List[datetime]
+    ends: List[datetime]
+    names: List[Optional[str]]
+    organizers: List[Optional[str]]
+
+
+class RoomSchedule(BaseModel):
+    room_id: int
+    name: str
+    days: List[ScheduleDay]
+
 
 class CreateInvitation(BaseModel):
     user_id: str
@@ -102,3 +171,62 @@ class Token(TunedModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
 
+
+class PoolStatus(BaseModel):
+    size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    waits: int
+    wait_timeouts: int
+    wait_avg_ms: float
+    wait_max_ms: float
+
+
+
+# start_time/end_time are the first occurrence, repeated every `interval` days/weeks/months
+# until `until` or for `count` occurrences; exdates are local days without an occurrence
+class CreateMeetingSeries(BaseModel):
+    room_id: int
+    organizer: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    freq: Literal["daily", "weekly", "monthly"]
+    interval: int = Field(1, ge=1)
+    until: Optional[datetime] = None
+    count: Optional[int] = Field(None, ge=1)
+    exdates: List[date] = []
+
+    @field_validator('start_time', 'end_time', 'until')
+    @classmethod
+    def attach_timezone(cls, value):
+        return as_local(value)
+
+    @model_validator(mode='after')
+    def check_rule(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        if self.until is None and self.count is None:
+            raise ValueError("until or count is required")
+        if self.end_time - self.start_time > MIN_STEP[self.freq] * self.interval:
+            raise ValueError("the meeting is longer than the time between its occurrences")
+        return self
+
+
+class GetMeetingSeries(TunedModel):
+    id: str
+    room_id: int
+    created_by: Optional[str] = None
+    organizer: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    freq: str
+    interval: int
+    until: Optional[datetime] = None
+    count: Optional[int] = None
+    exdates: List[date] = []
@@ -0,0 +1,8 @@
+import os
+
+# The unit tests don't connect to the database, but importing the app builds its engines and
+# token helpers from these settings; values already in the environment are kept
+for name, value in {"DB_USER": "postgres", "DB_PASSWORD": "", "DB_HOST": "127.0.0.1", "DB_PORT": "5432",
+                    "DB_NAME": "booking", "SECRET_KEY": "test", "ALGORITHM": "HS256",
+                    "ACCESS_TOKEN_EXPIRE_MINUTES": "15"}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from config.config import AVAILABILITY_MAX_DAYS, WORKDAY_START_HOUR, WORKDAY_END_HOUR
+from routers.app_routes import get_availability
+from utils.availability import free_slots, working_windows
+from utils.dates import LOCAL_TZ
+
+
+def local(day, hour, minute=0):
+    return datetime(2026, 11, day, hour, minute, tzinfo=LOCAL_TZ)
+
+
+# 09:00-18:00 working hours of 2 and 3 November
+WINDOWS = [(local(2, 9), local(2, 18)), (local(3, 9), local(3, 18))]
+
+
+def test_free_room_is_free_all_working_hours():
+    assert free_slots([], WINDOWS) == WINDOWS
+
+
+def test_overlapping_and_touching_meetings_are_merged():
+    busy = [(local(2, 10), local(2, 11)), (local(2, 10, 30), local(2, 12)), (local(2, 12), local(2, 13)),
+            (local(2, 15), local(2, 16))]
+    assert free_slots(busy, WINDOWS[:1]) == [(local(2, 9), local(2, 10)), (local(2, 13), local(2, 15)),
+                                              (local(2, 16), local(2, 18))]
+
+
+def test_meeting_inside_another_does_not_end_the_busy_period():
+    busy = [(local(2, 10), local(2, 14)), (local(2, 11), local(2, 12))]
+    assert free_slots(busy, WINDOWS[:1]) == [(local(2, 9), local(2, 10)), (local(2, 14), local(2, 18))]
+
+
+def test_meetings_are_clipped_to_working_hours():
+    # an overnight meeting until 10:00 and one running past the end of the day
+    busy = [(local(1, 20), local(2, 10)), (local(2, 17), local(2, 20)), (local(3, 8), local(3, 9, 30))]
+    assert free_slots(busy, WINDOWS) == [(local(2, 10), local(2, 17)), (local(3, 9, 30), local(3, 18))]
+
+
+def test_meeting_spanning_days_blocks_both():
+    busy = [(local(2, 16), local(3, 11))]
+    assert free_slots(busy, WINDOWS) == [(local(2, 9), local(2, 16)), (local(3, 11), local(3, 18))]
+
+
+def test_min_duration_drops_short_gaps():
+    busy = [(local(2, 9, 20), local(2, 12)), (local(2, 12, 30), local(2, 17, 45))]
+    assert free_slots(busy, WINDOWS[:1], timedelta(minutes=30)) == [(local(2, 12), local(2, 12, 30))]
+
+
+def test_utc_periods_are_returned_in_local_time():
+    # 05:00-06:00 UTC is 10:00-11:00 in Tashkent (UTC+5)
+    busy = [(datetime(2026, 11, 2, 5, tzinfo=timezone.utc), datetime(2026, 11, 2, 6, tzinfo=timezone.utc))]
+    slots = free_slots(busy, WINDOWS[:1])
+    assert slots == [(local(2, 9), local(2, 10)), (local(2, 11), local(2, 18))]
+    assert all(start.tzinfo == LOCAL_TZ and end.tzinfo == LOCAL_TZ for start, end in slots)
+
+
+def test_working_windows_follow_local_midnight():
+    windows = working_windows(date(2026, 11, 2), date(2026, 11, 4))
+    assert windows == [(datetime(2026, 11, day, tzinfo=LOCAL_TZ) + timedelta(hours=WORKDAY_START_HOUR),
+                        datetime(2026, 11, day, tzinfo=LOCAL_TZ) + timedelta(hours=WORKDAY_END_HOUR))
+                       for day in (2, 3, 4)]
+
+
+@pytest.mark.parametrize("days", [AVAILABILITY_MAX_DAYS, -1])
+def test_range_limit(days):
+    start = date(2026, 11, 2)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_availability(start_date=start, end_date=start + timedelta(days=days), min_duration=0,
+                                     db=None, current_user=None))
+    assert error.value.status_code == 400
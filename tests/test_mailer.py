@@ -0,0 +1,111 @@
+import asyncio
+import smtplib
+from types import SimpleNamespace
+
+import pytest
+
+from utils import outbox
+from utils.mailer import DeliveryError, Mailer, SMTPConnection, build_message
+
+
+class FakeSMTP:
+    # refuses the receivers in `refused` with their code and drops the connection at `disconnect_at`
+    def __init__(self, refused=None, disconnect_at=None):
+        self.refused = refused or {}
+        self.disconnect_at = disconnect_at
+        self.delivered = []
+        self.sends = 0
+
+    def send_message(self, message):
+        self.sends += 1
+        if self.sends == self.disconnect_at:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        receiver = message["To"]
+        if receiver in self.refused:
+            raise smtplib.SMTPRecipientsRefused({receiver: (self.refused[receiver], b"refused")})
+        self.delivered.append(receiver)
+
+    def noop(self):
+        return 250, b"OK"
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    # Mailer._connect hands out the queued fake sessions in turn
+    servers = []
+    monkeypatch.setattr(Mailer, "_connect", lambda self: SMTPConnection(servers.pop(0)))
+    return servers
+
+
+def send(receivers, batch_size=10):
+    mailer = Mailer(username="bot", password="secret", batch_size=batch_size)
+    return asyncio.run(mailer.send([build_message(receiver, "Subject", "Body") for receiver in receivers]))
+
+
+def test_all_receivers_are_delivered(connect):
+    server = FakeSMTP()
+    connect.append(server)
+    send(["a@x.uz", "b@x.uz"])
+    assert server.delivered == ["a@x.uz", "b@x.uz"]
+
+
+def test_only_receivers_refused_for_now_are_retried(connect):
+    server = FakeSMTP(refused={"b@x.uz": 450, "c@x.uz": 550, "e@x.uz": 421})
+    connect.append(server)
+    with pytest.raises(DeliveryError) as error:
+        send(["a@x.uz", "b@x.uz", "c@x.uz", "d@x.uz", "e@x.uz"], batch_size=2)
+    assert server.delivered == ["a@x.uz", "d@x.uz"]
+    assert error.value.failed == ["b@x.uz", "e@x.uz"]
+
+
+def test_lost_connection_is_replaced_once(connect):
+    first, second = FakeSMTP(disconnect_at=2), FakeSMTP()
+    connect.extend([first, second])
+    send(["a@x.uz", "b@x.uz", "c@x.uz"])
+    assert first.delivered + second.delivered == ["a@x.uz", "b@x.uz", "c@x.uz"]
+
+
+def test_receivers_not_sent_are_retried_when_the_replacement_fails_too(connect):
+    first, second = FakeSMTP(refused={"a@x.uz": 451}, disconnect_at=2), FakeSMTP(disconnect_at=1)
+    connect.extend([first, second])
+    with pytest.raises(DeliveryError) as error:
+        send(["a@x.uz", "b@x.uz", "c@x.uz"])
+    assert error.value.failed == ["a@x.uz", "b@x.uz", "c@x.uz"]
+
+
+def test_outbox_retry_payload_has_only_the_failed_receivers(connect, monkeypatch):
+    server = FakeSMTP(refused={"b@x.uz": 450})
+    connect.append(server)
+    meeting = SimpleNamespace(invitation=[SimpleNamespace(user_email=email) for email in ("a@x.uz", "b@x.uz")],
+                              organizer="Organizer", room=SimpleNamespace(name="Room"), name="Sync")
+
+    class Session:
+        async def __aenter__(self):
+            return None
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+    async def get_meeting_with_details(id, db):
+        return meeting
+
+    failed = []
+
+    async def fail_outbox_event(id, error, retry_in, db, payload=None):
+        failed.append(payload)
+
+    monkeypatch.setattr(outbox, "AsyncSessionLocal", Session)
+    monkeypatch.setattr(outbox, "mailer", Mailer(username="bot", password="secret"))
+    monkeypatch.setattr(outbox.crud, "get_meeting_with_details", get_meeting_with_details)
+    monkeypatch.setattr(outbox.crud, "fail_outbox_event", fail_outbox_event)
+    payload = {"meeting_id": "m1", "start_time": "10:00", "end_time": "11:00"}
+    event = SimpleNamespace(id=1, kind=outbox.EMAIL_INVITE, payload=payload, attempts=1)
+
+    asyncio.run(outbox.OutboxDispatcher().process(event))
+    assert server.delivered == ["a@x.uz"]
+    assert failed == [{**payload, "receivers": ["b@x.uz"]}]
+    # the claimed event itself is left as it was
+    assert "receivers" not in event.payload
@@ -0,0 +1,99 @@
+import base64
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from crud.crud import paginate_meetings
+from models import models
+from utils.dates import LOCAL_TZ
+from utils.pagination import (decode_cursor, encode_cursor, paginate, meeting_key, user_key, MEETING_CURSOR,
+                              USER_CURSOR, NEXT_CURSOR_HEADER)
+
+START = datetime(2026, 11, 2, 10, tzinfo=LOCAL_TZ)
+
+
+def test_meeting_cursor_round_trip():
+    meeting = SimpleNamespace(start_time=START, id="4f1c")
+    assert decode_cursor(encode_cursor(meeting_key(meeting)), MEETING_CURSOR) == (START, "4f1c")
+
+
+def test_user_cursor_round_trip():
+    assert decode_cursor(encode_cursor(user_key(SimpleNamespace(id="1049"))), USER_CURSOR) == ("1049",)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor([START, "id?/+=&"])
+    assert cursor == cursor.strip("=") and not set(cursor) & set("+/=?&")
+
+
+def test_no_cursor_is_the_first_page():
+    assert decode_cursor(None, MEETING_CURSOR) is None
+
+
+def b64(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor!",
+    "ключ",
+    b64(b"{not json"),
+    b64(b"\xff\xfe"),
+    b64(b'{"start": 1}'),
+    b64(b'["2026-11-02T10:00:00+05:00"]'),
+    b64(b'["2026-11-02T10:00:00+05:00", "a", "b"]'),
+    b64(b'["yesterday", "a"]'),
+    b64(b'[1, "a"]'),
+    b64(b'[null, "a"]'),
+])
+def test_malformed_cursor_is_rejected_with_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, MEETING_CURSOR)
+    assert error.value.status_code == 400
+
+
+def test_tampered_cursor_is_rejected_with_400():
+    cursor = encode_cursor([START, "4f1c"])
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor[:-3] + "!!!", MEETING_CURSOR)
+    assert error.value.status_code == 400
+
+
+def page_after(meetings, after, limit):
+    # what paginate_meetings selects: (start_time, id) > after in that order, limit + 1 rows
+    rows = sorted(meetings, key=lambda meeting: (meeting.start_time, meeting.id))
+    if after is not None:
+        rows = [meeting for meeting in rows if (meeting.start_time, meeting.id) > after]
+    return rows[:limit + 1]
+
+
+def test_meetings_with_equal_start_times_are_paged_by_id():
+    meetings = [SimpleNamespace(start_time=START, id=f"m{index}") for index in range(5)]
+    seen, cursor = [], None
+    while True:
+        response = Response()
+        page = paginate(page_after(meetings, decode_cursor(cursor, MEETING_CURSOR), 2), 2, response, meeting_key)
+        seen.extend(meeting.id for meeting in page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert seen == ["m0", "m1", "m2", "m3", "m4"]
+
+
+def test_last_page_has_no_cursor():
+    response = Response()
+    assert len(paginate([1, 2], 2, response, lambda item: [item])) == 2
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_meeting_query_orders_and_seeks_by_start_time_and_id():
+    statement = paginate_meetings(select(models.Meeting), limit=2, after=(START, "m1"))
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "(meetings.start_time, meetings.id) > (" in sql
+    assert "ORDER BY meetings.start_time, meetings.id" in sql
+    assert 3 in statement.compile().params.values()
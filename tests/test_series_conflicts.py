@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import ValidationError
+
+from crud import crud
+from schemas.schemas import CreateMeeting, CreateMeetingBatch, CreateMeetingSeries
+from utils.dates import LOCAL_TZ
+from utils.recurrence import occurrences
+
+# weekly 10:00-11:00 series in room 1; the frontend sends meeting times naive, in the office timezone
+SERIES = CreateMeetingSeries(room_id=1, name="Standup", start_time=datetime(2026, 1, 5, 10, tzinfo=LOCAL_TZ),
+                             end_time=datetime(2026, 1, 5, 11, tzinfo=LOCAL_TZ), freq="weekly", count=10)
+
+
+@pytest.fixture(autouse=True)
+def room_with_series(monkeypatch):
+    async def lock_room(room_id, db, exclusive=False):
+        pass
+
+    async def get_series_between(start, end, db, room_id=None):
+        return [SERIES] if room_id == SERIES.room_id else []
+
+    monkeypatch.setattr(crud, "lock_room", lock_room)
+    monkeypatch.setattr(crud, "get_series_between", get_series_between)
+
+
+def series_conflict(meeting):
+    return asyncio.run(crud.get_series_conflict(meeting.room_id, meeting.start_time, meeting.end_time, db=None))
+
+
+@pytest.mark.parametrize("tzinfo", [None, LOCAL_TZ])
+def test_booking_into_series_occurrence_conflicts(tzinfo):
+    meeting = CreateMeeting(room_id=1, description=None, start_time=datetime(2026, 1, 12, 10, 30, tzinfo=tzinfo),
+                            end_time=datetime(2026, 1, 12, 11, 30, tzinfo=tzinfo))
+    assert meeting.start_time.tzinfo is not None
+    assert series_conflict(meeting) == (datetime(2026, 1, 12, 10, tzinfo=LOCAL_TZ),
+                                        datetime(2026, 1, 12, 11, tzinfo=LOCAL_TZ))
+
+
+@pytest.mark.parametrize("tzinfo", [None, LOCAL_TZ])
+def test_booking_between_series_occurrences_is_free(tzinfo):
+    meeting = CreateMeeting(room_id=1, description=None, start_time=datetime(2026, 1, 12, 11, tzinfo=tzinfo),
+                            end_time=datetime(2026, 1, 12, 12, tzinfo=tzinfo))
+    assert series_conflict(meeting) is None
+
+
+def test_batch_mixing_naive_and_aware_times():
+    start = datetime(2026, 1, 13, 10)
+    with pytest.raises(ValidationError, match="meetings 0 and 1 overlap"):
+        CreateMeetingBatch(meetings=[
+            CreateMeeting(room_id=1, description=None, start_time=start, end_time=start + timedelta(hours=1)),
+            CreateMeeting(room_id=1, description=None, start_time=start.replace(tzinfo=LOCAL_TZ) + timedelta(minutes=30),
+                          end_time=start.replace(tzinfo=LOCAL_TZ) + timedelta(hours=2)),
+        ])
+
+
+def test_series_with_naive_until():
+    series = CreateMeetingSeries(room_id=1, start_time=datetime(2026, 1, 5, 10), end_time=datetime(2026, 1, 5, 11),
+                                 freq="daily", until=datetime(2026, 1, 7, 10))
+    assert [start.day for start, _ in occurrences(series)] == [5, 6, 7]
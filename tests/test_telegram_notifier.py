@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils import bot_requests
+from utils.bot_requests import DIGEST_SEPARATOR, MAX_MESSAGE_LENGTH, TelegramNotifier, TokenBucket
+
+real_sleep = asyncio.sleep
+
+
+# Every sleep advances the time, so time only adds up for a single sleeping task
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += max(seconds, 0)
+        await real_sleep(0)
+
+
+class FakeTelegram:
+    # answers sendMessage with the queued statuses, then 200
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+        self.statuses = []
+
+    async def post_message(self, bot_token, chat_id, message_text, **kwargs):
+        self.sent.append((self.clock.now, chat_id, message_text))
+        status = self.statuses.pop(0) if self.statuses else 200
+        return SimpleNamespace(status_code=status, headers={},
+                               json=lambda: {"ok": False, "parameters": {"retry_after": 5}})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(bot_requests, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(bot_requests.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def telegram(clock, monkeypatch):
+    telegram = FakeTelegram(clock)
+    monkeypatch.setattr(bot_requests, "post_message", telegram.post_message)
+    return telegram
+
+
+def test_bucket_allows_a_burst_then_the_rate(clock):
+    async def acquire_times():
+        bucket = TokenBucket(rate=0.5, capacity=3)
+        times = []
+        for _ in range(5):
+            await bucket.acquire()
+            times.append(clock.now)
+        return times
+
+    assert asyncio.run(acquire_times()) == [0, 0, 0, 2, 4]
+
+
+def test_drained_bucket_waits_for_a_token(clock):
+    async def wait_after_drain():
+        bucket = TokenBucket(rate=1, capacity=3)
+        bucket.drain()
+        await bucket.acquire()
+        return clock.now
+
+    assert asyncio.run(wait_after_drain()) == 1
+
+
+def test_messages_within_the_window_are_sent_as_one_digest(telegram):
+    async def notify():
+        notifier = TelegramNotifier(bot_token="t", rate=1, burst=1, window=2)
+        return await asyncio.gather(*(notifier.notify("chat", f"message {index}") for index in range(3)))
+
+    assert asyncio.run(notify()) == [True, True, True]
+    assert telegram.sent == [(2, "chat", DIGEST_SEPARATOR.join(["message 0", "message 1", "message 2"]))]
+
+
+def test_chats_are_sent_separately(telegram):
+    async def notify():
+        notifier = TelegramNotifier(bot_token="t", rate=1, burst=1, window=2)
+        await asyncio.gather(notifier.notify("a", "first"), notifier.notify("b", "second"))
+
+    asyncio.run(notify())
+    assert sorted((chat_id, text) for _, chat_id, text in telegram.sent) == [("a", "first"), ("b", "second")]
+
+
+def test_digests_of_a_chat_are_rate_limited(telegram):
+    async def notify():
+        notifier = TelegramNotifier(bot_token="t", rate=0.1, burst=1, window=1)
+        await notifier.notify("chat", "first")
+        # queued while the bucket is empty, so the two go out together once it refills
+        await asyncio.gather(notifier.notify("chat", "second"), notifier.notify("chat", "third"))
+
+    asyncio.run(notify())
+    assert telegram.sent == [(1, "chat", "first"), (11, "chat", f"second{DIGEST_SEPARATOR}third")]
+
+
+def test_digest_is_split_at_the_message_length_limit(telegram):
+    long_text = "x" * (MAX_MESSAGE_LENGTH - 10)
+
+    async def notify():
+        notifier = TelegramNotifier(bot_token="t", rate=1, burst=5, window=1)
+        await asyncio.gather(notifier.notify("chat", long_text), notifier.notify("chat", "short"))
+
+    asyncio.run(notify())
+    assert [text for _, _, text in telegram.sent] == [long_text, "short"]
+
+
+def test_rate_limited_digest_is_retried_after_retry_after(telegram):
+    telegram.statuses = [429]
+
+    async def notify():
+        notifier = TelegramNotifier(bot_token="t", rate=1, burst=1, window=1, max_retries=1)
+        return await notifier.notify("chat", "hello")
+
+    assert asyncio.run(notify()) is True
+    assert [(time, text) for time, _, text in telegram.sent] == [(1, "hello"), (6, "hello")]
+
+
+def test_undelivered_digest_fails_every_message(telegram):
+    telegram.statuses = [500]
+
+    async def notify():
+        notifier = TelegramNotifier(bot_token="t", rate=1, burst=1, window=1)
+        return await asyncio.gather(notifier.notify("chat", "a"), notifier.notify("chat", "b"),
+                                    return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(notify())] == [RuntimeError, RuntimeError]
+    assert len(telegram.sent) == 1
@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+from config.config import WORKDAY_START_HOUR, WORKDAY_END_HOUR
+from utils.dates import day_bounds, LOCAL_TZ
+
+
+# Working-hours window of every day from start_date to end_date (inclusive)
+def working_windows(start_date: date, end_date: date):
+    windows = []
+    day = start_date
+    while day <= end_date:
+        day_start, _ = day_bounds(day)
+        windows.append((day_start + timedelta(hours=WORKDAY_START_HOUR),
+                        day_start + timedelta(hours=WORKDAY_END_HOUR)))
+        day += timedelta(days=1)
+    return windows
+
+
+# Gaps between busy periods inside the windows, in one pass over both sorted lists.
+# busy is a list of (start, end) sorted by start, windows a sorted list of (start, end).
+# Slots are returned in the office timezone.
+def free_slots(busy, windows, min_duration: timedelta = timedelta(0)):
+    slots = []
+    first = 0
+    for window_start, window_end in windows:
+        while first < len(busy) and busy[first][1] <= window_start:
+            first += 1
+        cursor = window_start
+        i = first
+        while i < len(busy) and busy[i][0] < window_end:
+            start, end = busy[i]
+            if start > cursor and start - cursor >= min_duration:
+                slots.append((cursor.astimezone(LOCAL_TZ), start.astimezone(LOCAL_TZ)))
+            cursor = max(cursor, end)
+            i += 1
+        if cursor < window_end and window_end - cursor >= min_duration:
+            slots.append((cursor.astimezone(LOCAL_TZ), window_end))
+    return slots
@@ -1,16 +1,145 @@
-import requests
+import asyncio
+import logging
+import time
+import httpx
+from config.config import BOT_TOKEN, TELEGRAM_API_URL, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST, TELEGRAM_COALESCE_WINDOW, \
+    TELEGRAM_MAX_RETRIES, HTTP_RETRY_MAX_BACKOFF
+from utils.http_client import request
 
+logger = logging.getLogger(__name__)
 
-async def send_to_chat(bot_token, chat_id, message_text):
+# Telegram rejects longer messages
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = "\n\n— — —\n\n"
+
+
+async def post_message(bot_token, chat_id, message_text, **kwargs):
     # Create the request payload
     payload = {"chat_id": chat_id, "text": message_text, "parse_mode": "HTML"}
+    return await request("POST", f"{TELEGRAM_API_URL}/bot{bot_token}/sendMessage", json=payload, **kwargs)
+
+
+def retry_after(response):
+    # Telegram puts the wait into the body ({"parameters": {"retry_after": n}}), proxies into the header
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        header = response.headers.get("Retry-After", "")
+        return float(header) if header.isdigit() else 1.0
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+    # after a 429 the chat starts again from an empty bucket
+    def drain(self):
+        self._refill()
+        self.tokens = 0
+
+
+class ChatQueue:
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        self.pending = []
+        self.task = None
+
+
+# Per-chat notification queue: messages queued within the coalescing window (or while
+# the chat is rate limited) are sent as a single digest, at most `rate` messages per second
+# per chat. notify() returns once the message was delivered and raises if it wasn't.
+class TelegramNotifier:
+    def __init__(self, bot_token=BOT_TOKEN, rate=TELEGRAM_CHAT_RATE, burst=TELEGRAM_CHAT_BURST,
+                 window=TELEGRAM_COALESCE_WINDOW, max_retries=TELEGRAM_MAX_RETRIES):
+        self.bot_token = bot_token
+        self.rate = rate
+        self.burst = burst
+        self.window = window
+        self.max_retries = max_retries
+        self._chats = {}
+
+    async def notify(self, chat_id, message_text):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = ChatQueue(self.rate, self.burst)
+        future = asyncio.get_running_loop().create_future()
+        chat.pending.append((message_text, future))
+        if chat.task is None or chat.task.done():
+            chat.task = asyncio.create_task(self._run(chat_id, chat))
+        return await future
+
+    async def close(self):
+        tasks = [chat.task for chat in self._chats.values() if chat.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for chat in self._chats.values():
+            for _, future in chat.pending:
+                if not future.done():
+                    future.set_exception(RuntimeError("Telegram notifier closed"))
+            chat.pending.clear()
+        self._chats.clear()
+
+    def _take_digest(self, chat):
+        # as many queued messages as fit into one Telegram message, oldest first
+        texts, futures, length = [], [], 0
+        for text, future in chat.pending:
+            added = len(text) + (len(DIGEST_SEPARATOR) if texts else 0)
+            if texts and length + added > MAX_MESSAGE_LENGTH:
+                break
+            texts.append(text)
+            futures.append(future)
+            length += added
+        del chat.pending[:len(texts)]
+        return DIGEST_SEPARATOR.join(texts)[:MAX_MESSAGE_LENGTH], futures
+
+    async def _run(self, chat_id, chat):
+        while chat.pending:
+            await asyncio.sleep(self.window)
+            await chat.bucket.acquire()
+            text, futures = self._take_digest(chat)
+            error = await self._send(chat_id, chat, text)
+            for future in futures:
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(True)
+                else:
+                    future.set_exception(error)
+
+    async def _send(self, chat_id, chat, text):
+        for attempt in range(self.max_retries + 1):
+            try:
+                # 429 is handled here, against the chat's bucket, not by the shared client
+                response = await post_message(self.bot_token, chat_id, text, retries=0)
+            except httpx.HTTPError as e:
+                return e
+            if response.status_code == 200:
+                return None
+            if response.status_code != 429 or attempt == self.max_retries:
+                return RuntimeError(f"Telegram sendMessage failed: {response.status_code}")
+            delay = retry_after(response)
+            chat.bucket.drain()
+            if delay > HTTP_RETRY_MAX_BACKOFF:
+                # left to the outbox retry rather than holding the digest's senders
+                return RuntimeError(f"Telegram rate limit, retry after {delay}s")
+            logger.warning("Telegram rate limit for chat %s, retrying in %ss", chat_id, delay)
+            await asyncio.sleep(delay)
+
 
-    # Send the request to send the inline keyboard message
-    response = requests.post(
-        f"https://api.telegram.org/bot{bot_token}/sendMessage", json=payload,
-    )
-    # Check the response status
-    if response.status_code == 200:
-        return response
-    else:
-        return False
\ No newline at end of file
+telegram_notifier = TelegramNotifier()
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from config.config import USER_CACHE_TTL, USER_CACHE_SIZE, ROLE_CACHE_TTL, ROOM_CACHE_TTL
+from utils.pg_listener import pg_listener
+
+
+# Bounded in-process LRU cache, entries expire ttl seconds after being set.
+# Each uvicorn worker has its own copy. Changes made by other workers arrive as NOTIFYs on
+# pg_listener (auth_changes from migration a7d3e9c2f5b1, the change versions for rooms) and
+# invalidate every worker; the caches are only read while pg_listener is connected and are
+# cleared whenever it reconnects, so the ttl is a memory bound, not the staleness bound.
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # bumped by clear() and pop(), lets a reader drop a value loaded while the cache was invalidated
+        self.generation = 0
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+        self.generation += 1
+
+    def clear(self):
+        self._data.clear()
+        self.generation += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Authenticated users (schemas.GetUser) keyed by the JWT subject (email)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# The (small) roles table as schemas.GetUserRole keyed by role id, cleared on any role change
+role_cache = TTLCache(maxsize=256, ttl=ROLE_CACHE_TTL)
+
+# user_cache and role_cache decide permissions, so they are only trusted while the other
+# workers' changes are received (migration a7d3e9c2f5b1) and are cleared when they may be missed
+AUTH_CHANNEL = "auth_changes"
+
+
+def invalidate_auth(payload):
+    if payload == "roles":
+        role_cache.clear()
+    elif payload == "users":
+        user_cache.clear()
+    else:
+        user_cache.pop(payload.removeprefix("user:"))
+
+
+pg_listener.listen(AUTH_CHANNEL, invalidate_auth)
+pg_listener.on_reset(role_cache.clear)
+pg_listener.on_reset(user_cache.clear)
+
+# The room catalogue (list of schemas.GetRoom under "all"), cleared by create/update_room
+# and, for the other workers, by the rooms change notification (utils/versions.py)
+room_cache = TTLCache(maxsize=1, ttl=ROOM_CACHE_TTL)
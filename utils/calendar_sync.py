@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import json
+import logging
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+import httpx
+from config.config import GOOGLE_API_KEY, GOOGLE_API_URL, CALENDAR_RECONCILE_INTERVAL, CALENDAR_RECONCILE_DAYS
+from config.db import AsyncSessionLocal
+from crud import crud
+from utils.google_calendar import event_body, EVENTS_PATH, MANAGED_PROPERTY
+from utils.http_client import request, close_http_client
+
+logger = logging.getLogger(__name__)
+
+BATCH_URL = f"{GOOGLE_API_URL}/batch/calendar/v3"
+EVENTS_URL = f"{GOOGLE_API_URL}{EVENTS_PATH}"
+# Google accepts at most 50 requests per batch call
+BATCH_LIMIT = 50
+
+# Statuses that mean the calendar already is in the wanted state
+INSERT_OK = {200, 409}
+UPDATE_OK = {200}
+DELETE_OK = {200, 204, 404, 410}
+
+
+# ----------------------- OPERATIONS ------------------------------------
+# An operation is a (method, path, body) triple, sent as one part of a batch call
+def insert_operation(meeting, message_text=None):
+    body = event_body(id=meeting.id, organizer=meeting.organizer, room=meeting.room.name, title=meeting.description,
+                      start_time=meeting.start_time, end_time=meeting.end_time,
+                      guests=[{"email": invitation.user_email} for invitation in meeting.invitation],
+                      message_text=message_text or meeting.description)
+    return "POST", EVENTS_PATH, body
+
+
+# Fields of event_body() the reconciliation compares and repairs. The description is the
+# notification text of the booking, which is not stored, so it is left as it was created.
+SYNCED_FIELDS = ("status", "summary", "location", "start", "end", "attendees", "extendedProperties")
+
+
+def update_operation(meeting):
+    body = insert_operation(meeting)[2]
+    # an event that was deleted in Google is restored along with its times, an event created before
+    # MANAGED_PROPERTY existed gets it
+    body = {key: body[key] for key in SYNCED_FIELDS}
+    return "PATCH", f"{EVENTS_PATH}/{meeting.id}", body
+
+
+def delete_operation(meeting_id):
+    return "DELETE", f"{EVENTS_PATH}/{meeting_id}", None
+
+
+def encode_batch(operations, boundary):
+    parts = []
+    for index, (method, path, body) in enumerate(operations):
+        part = (f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <{index}>\r\n\r\n"
+                f"{method} {path}\r\n")
+        if body is None:
+            part += "\r\n"
+        else:
+            part += f"Content-Type: application/json\r\n\r\n{json.dumps(body)}\r\n"
+        parts.append(part)
+    parts.append(f"--{boundary}--\r\n")
+    return "".join(parts)
+
+
+# Status and JSON body of every part of a batch response, by position in the request
+def decode_batch(response):
+    match = re.search(r'boundary="?([^";]+)"?', response.headers.get("content-type", ""))
+    if not match:
+        return {}
+    results = {}
+    for part in response.text.replace("\r\n", "\n").split(f"--{match.group(1)}"):
+        head, _, http = part.partition("\n\n")
+        content_id = re.search(r"Content-ID:\s*<response-(\d+)>", head, re.IGNORECASE)
+        if not content_id:
+            continue
+        status_line, _, rest = http.partition("\n")
+        _, _, body = rest.partition("\n\n")
+        body = body.strip()
+        try:
+            body = json.loads(body) if body else None
+        except ValueError:
+            pass
+        results[int(content_id.group(1))] = (int(status_line.split()[1]), body)
+    return results
+
+
+async def execute_batch(google_token, operations):
+    # one call per BATCH_LIMIT operations of a single calendar owner, statuses in operations order
+    # (None when the call itself failed)
+    statuses = []
+    for offset in range(0, len(operations), BATCH_LIMIT):
+        chunk = operations[offset:offset + BATCH_LIMIT]
+        boundary = f"batch_{uuid.uuid4().hex}"
+        headers = {
+            'Authorization': f'Bearer {google_token}',
+            'Content-Type': f'multipart/mixed; boundary={boundary}',
+        }
+        try:
+            # every part is keyed by the meeting id, so repeating the batch is harmless
+            response = await request("POST", f"{BATCH_URL}?key={GOOGLE_API_KEY}", headers=headers,
+                                     content=encode_batch(chunk, boundary), idempotent=True)
+        except httpx.HTTPError as e:
+            logger.warning("Google Calendar batch failed: %r", e)
+            statuses.extend([None] * len(chunk))
+            continue
+        if response.status_code != 200:
+            logger.warning("Google Calendar batch failed: %s", response.status_code)
+            statuses.extend([None] * len(chunk))
+            continue
+        results = decode_batch(response)
+        statuses.extend(results.get(index, (None, None))[0] for index in range(len(chunk)))
+    return statuses
+
+
+# Runs (google_token, operation) pairs grouped by calendar owner, statuses in the given order
+async def execute(operations):
+    by_token = {}
+    for index, (google_token, operation) in enumerate(operations):
+        by_token.setdefault(google_token, []).append((index, operation))
+    statuses = [None] * len(operations)
+    for google_token, items in by_token.items():
+        results = await execute_batch(google_token, [operation for _, operation in items])
+        for (index, _), status in zip(items, results):
+            statuses[index] = status
+    return statuses
+
+
+# ----------------------- RECONCILIATION ------------------------------------
+async def list_managed_events(google_token, time_min, time_max):
+    # only events created by this service, including the ones deleted in Google
+    events = []
+    params = {
+        "key": GOOGLE_API_KEY,
+        "timeMin": time_min.isoformat(),
+        "timeMax": time_max.isoformat(),
+        "privateExtendedProperty": f"{MANAGED_PROPERTY}=1",
+        "showDeleted": "true",
+        "singleEvents": "true",
+        "maxResults": 2500,
+    }
+    headers = {'Authorization': f'Bearer {google_token}'}
+    while True:
+        response = await request("GET", EVENTS_URL, params=params, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        events.extend(data.get("items", []))
+        if not data.get("nextPageToken"):
+            return events
+        params["pageToken"] = data["nextPageToken"]
+
+
+def same_period(event, meeting):
+    try:
+        start = datetime.fromisoformat(event["start"]["dateTime"])
+        end = datetime.fromisoformat(event["end"]["dateTime"])
+    except (KeyError, ValueError):
+        return False
+    return start == meeting.start_time and end == meeting.end_time
+
+
+def guest_emails(event):
+    # Google lowercases the emails and lists the calendar owner (self) among the attendees
+    return {guest["email"].lower() for guest in event.get("attendees") or [] if not guest.get("self")}
+
+
+def in_sync(event, meeting):
+    # the event has the SYNCED_FIELDS the meeting's event_body() would give it
+    body = update_operation(meeting)[2]
+    owners = {guest["email"].lower() for guest in event.get("attendees") or [] if guest.get("self")}
+    return (event.get("status") == body["status"] and same_period(event, meeting)
+            and event.get("summary") == body["summary"] and event.get("location") == body["location"]
+            and guest_emails(event) == guest_emails(body) - owners)
+
+
+def diff_events(meetings, events):
+    # operations turning the calendar's events into the meetings, the event id is the meeting id
+    events = {event["id"]: event for event in events}
+    operations = []
+    for meeting in meetings:
+        event = events.pop(meeting.id, None)
+        if event is None:
+            operations.append(insert_operation(meeting))
+        elif not in_sync(event, meeting):
+            operations.append(update_operation(meeting))
+    for event_id, event in events.items():
+        if event.get("status") != "cancelled":
+            operations.append(delete_operation(event_id))
+    return operations
+
+
+def operation_ok(operation, status):
+    method = operation[0]
+    return status in (INSERT_OK if method == "POST" else UPDATE_OK if method == "PATCH" else DELETE_OK)
+
+
+async def reconcile_user(user, time_min, time_max):
+    async with AsyncSessionLocal() as db:
+        meetings = await crud.get_user_meetings_between(user_id=user.id, start=time_min, end=time_max, db=db)
+    events = await list_managed_events(user.google_token, time_min, time_max)
+    operations = diff_events(meetings, events)
+    if not operations:
+        return 0, 0
+    statuses = await execute_batch(user.google_token, operations)
+    # 409: the event exists but wasn't listed, it was created before MANAGED_PROPERTY and is patched instead
+    meetings = {meeting.id: meeting for meeting in meetings}
+    unmanaged = [index for index, (operation, status) in enumerate(zip(operations, statuses))
+                 if operation[0] == "POST" and status == 409]
+    if unmanaged:
+        patches = [update_operation(meetings[operations[index][2]["id"]]) for index in unmanaged]
+        for index, patch, status in zip(unmanaged, patches, await execute_batch(user.google_token, patches)):
+            operations[index], statuses[index] = patch, status
+    failed = sum(not operation_ok(operation, status) for operation, status in zip(operations, statuses))
+    return len(operations), failed
+
+
+async def reconcile(days=CALENDAR_RECONCILE_DAYS):
+    # repairs the upcoming `days` of every connected calendar, returns (operations, failed)
+    time_min = datetime.now(timezone.utc)
+    time_max = time_min + timedelta(days=days)
+    async with AsyncSessionLocal() as db:
+        users = await crud.get_calendar_users(db=db)
+    total = failed = 0
+    for user in users:
+        try:
+            done, user_failed = await reconcile_user(user, time_min, time_max)
+        except httpx.HTTPError as e:
+            logger.warning("Calendar reconciliation failed for user %s: %r", user.id, e)
+            continue
+        total += done
+        failed += user_failed
+    if total:
+        logger.info("Calendar reconciliation: %s operations, %s failed", total, failed)
+    return total, failed
+
+
+class CalendarReconciler:
+    def __init__(self, interval=CALENDAR_RECONCILE_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await reconcile()
+            except Exception:
+                logger.exception("Calendar reconciliation failed")
+
+
+calendar_reconciler = CalendarReconciler()
+
+
+# Standalone reconciler: python -m utils.calendar_sync [--once]
+async def main(once=False):
+    try:
+        await reconcile()
+        reconciler = CalendarReconciler()
+        if not once and reconciler.interval > 0:
+            await reconciler.run()
+    finally:
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile the Google calendars with the booked meetings")
+    parser.add_argument("--once", action="store_true", help="make a single pass and exit")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args().once))
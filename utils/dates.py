@@ -0,0 +1,18 @@
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+from config.config import TIMEZONE
+
+LOCAL_TZ = ZoneInfo(TIMEZONE)
+
+
+# Half-open [start, end) timestamp range covering a calendar day in the office timezone
+def day_bounds(day: date):
+    start = datetime.combine(day, time.min, tzinfo=LOCAL_TZ)
+    return start, datetime.combine(day + timedelta(days=1), time.min, tzinfo=LOCAL_TZ)
+
+
+# Naive datetimes sent by the clients are office wall-clock times
+def as_local(value: datetime):
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=LOCAL_TZ)
+    return value
@@ -0,0 +1,41 @@
+import csv
+import io
+import json
+from config.db import AsyncSessionLocal
+from crud import crud
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+FIELDS = ["id", "room_id", "created_by", "organizer", "name", "description", "start_time", "end_time"]
+DETAIL_FIELDS = ["room_name", "invitees"]
+
+
+def ndjson_chunk(rows):
+    return "".join(json.dumps(dict(row), default=lambda value: value.isoformat(), ensure_ascii=False) + "\n"
+                   for row in rows)
+
+
+def csv_chunk(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = []
+        for field in fields:
+            value = row[field]
+            if isinstance(value, list):
+                value = ";".join(value)
+            elif hasattr(value, "isoformat"):
+                value = value.isoformat()
+            values.append(value)
+        writer.writerow(values)
+    return buffer.getvalue()
+
+
+# Body of the export response, one chunk per partition of the server-side cursor
+async def export_meetings(format, start=None, end=None, room_id=None, with_details=False):
+    fields = FIELDS + DETAIL_FIELDS if with_details else FIELDS
+    if format == "csv":
+        yield ",".join(fields) + "\r\n"
+    # own session: the body is streamed after the request's dependencies are closed
+    async with AsyncSessionLocal() as db:
+        async for rows in crud.stream_meetings(db=db, start=start, end=end, room_id=room_id, with_details=with_details):
+            yield csv_chunk(rows, fields) if format == "csv" else ndjson_chunk(rows)
@@ -1,15 +1,10 @@
 import datetime
-import json
 import os.path
-import requests
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from starlette.responses import JSONResponse
-
-from config.config import GOOGLE_API_KEY
 
 # If modifying these scopes, delete the file token.json.
 # SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
@@ -69,50 +64,32 @@ async def create_service():
     return creds
 
 
-async def create_event(google_token, id, organizer, room, title, start_time, end_time, guests, message_text):
-    api_key = GOOGLE_API_KEY
-    start_time = str(start_time)
-    end_time = str(end_time)
-    try:
-        event_body = {
-            "id": id,
-            "summary": title,
-            "location": room,
-            "description": message_text,
-            "colorId": 6,
-            "status": "confirmed",
-            "start": {
-                "dateTime": f"{start_time.split(sep=' ')[0]}T{start_time.split(sep=' ')[1]}",
-                "timeZone": "Asia/Tashkent"
-            },
-            "end": {
-                "dateTime": f"{end_time.split(sep=' ')[0]}T{end_time.split(sep=' ')[1]}",
-                "timeZone": "Asia/Tashkent"
-            },
-            "organizer": {
-                "displayName ": organizer,
-                "self": False
-            },
-            "attendees": guests
-        }
-        headers = {
-            'Authorization': f'Bearer {google_token}',
-            'Content-Type': 'application/json',
-        }
-        url = f"https://www.googleapis.com/calendar/v3/calendars/primary/events?key={api_key}"
-        event = requests.post(url=url, headers=headers, data=json.dumps(event_body))
-    except HttpError as error:
-        JSONResponse({"Message": "Error occured with Google calendar Api"})
-
-
-async def delete_event(id, google_token):
-    api_key = GOOGLE_API_KEY
-    try:
-        url = f"https://www.googleapis.com/calendar/v3/calendars/primary/events/{id}?key={api_key}"
-        headers = {
-            'Authorization': f'Bearer {google_token}',
-            'Content-Type': 'application/json',
-        }
-        deleted_event = requests.delete(url=url, headers=headers)
-    except HttpError as error:
-        JSONResponse({"Message": "Error occured with Google calendar Api"})
+# Private extended property set on every event this service creates, so the
+# reconciliation job (utils/calendar_sync.py) only ever touches its own events
+MANAGED_PROPERTY = "bookMeetingRoom"
+EVENTS_PATH = "/calendar/v3/calendars/primary/events"
+
+
+def event_body(id, organizer, room, title, start_time, end_time, guests, message_text):
+    return {
+        "id": id,
+        "summary": title,
+        "location": room,
+        "description": message_text,
+        "colorId": 6,
+        "status": "confirmed",
+        "start": {
+            "dateTime": start_time.isoformat(),
+            "timeZone": "Asia/Tashkent"
+        },
+        "end": {
+            "dateTime": end_time.isoformat(),
+            "timeZone": "Asia/Tashkent"
+        },
+        "organizer": {
+            "displayName ": organizer,
+            "self": False
+        },
+        "attendees": guests,
+        "extendedProperties": {"private": {MANAGED_PROPERTY: "1"}}
+    }
@@ -0,0 +1,81 @@
+import asyncio
+import random
+import time
+import httpx
+from config.config import HTTP_TIMEOUT, HTTP_MAX_RETRIES, HTTP_MAX_CONNECTIONS, HTTP_RETRY_MAX_BACKOFF
+from utils.metrics import observe_outbound
+
+# Responses worth another try; 429 and 503 mean the request was not processed
+# (and usually come with Retry-After), so they are retried for POST as well
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+NOT_PROCESSED_STATUSES = {429, 503}
+# Errors raised before the request reached the server, safe to retry for any method
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+_client = None
+
+
+# One keep-alive connection pool per process, opened lazily and closed by the app lifespan
+def get_http_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS // 5 or 1),
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# Seconds to wait before the next attempt, None when the server's Retry-After is longer than
+# HTTP_RETRY_MAX_BACKOFF and the response should be returned instead of waited out
+def backoff(attempt, response=None):
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after) if float(retry_after) <= HTTP_RETRY_MAX_BACKOFF else None
+    return min(0.5 * 2 ** attempt, 8, HTTP_RETRY_MAX_BACKOFF) * random.uniform(0.5, 1)
+
+
+# Request through the shared client, retrying transient failures with backoff.
+# POST is only retried when it can't have been processed, unless the caller marks it idempotent.
+async def request(method, url, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await send_with_retries(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        observe_outbound(url, method, started, error=e)
+        raise
+    observe_outbound(url, method, started, response=response)
+    return response
+
+
+async def send_with_retries(method, url, *, timeout=None, retries=HTTP_MAX_RETRIES, idempotent=None, **kwargs):
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    client = get_http_client()
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            response = await client.request(method, url, timeout=timeout or HTTP_TIMEOUT, **kwargs)
+        except CONNECT_ERRORS:
+            if attempt == retries:
+                raise
+        except httpx.TransportError:
+            if attempt == retries or not idempotent:
+                raise
+        else:
+            retry = response.status_code in (RETRY_STATUSES if idempotent else NOT_PROCESSED_STATUSES)
+            if not retry or attempt == retries:
+                return response
+        delay = backoff(attempt, response)
+        if delay is None:
+            return response
+        await asyncio.sleep(delay)
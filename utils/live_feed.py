@@ -0,0 +1,108 @@
+import asyncio
+import json
+from datetime import date
+from fastapi import WebSocket, WebSocketDisconnect
+from config.config import LIVE_FEED_QUEUE_SIZE
+from utils.pg_listener import pg_listener
+
+CHANNEL = "meeting_changes"
+# sent after subscribing: changes from here on are delivered, the client (re)loads its schedule now
+SUBSCRIBED = json.dumps({"type": "subscribed"})
+# notifications may have been missed (listener reconnect, slow client), the client reloads its schedule
+RESET = json.dumps({"type": "reset"})
+INVALID_SUBSCRIPTION = json.dumps({"type": "error", "detail": "Invalid subscription!"})
+
+
+class Subscription:
+    def __init__(self, room_ids=None, dates=None, queue_size=LIVE_FEED_QUEUE_SIZE):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.update(room_ids, dates)
+
+    def update(self, room_ids=None, dates=None):
+        # empty means every room / every day
+        self.room_ids = set(room_ids) if room_ids else None
+        self.dates = {day.isoformat() for day in dates} if dates else None
+
+    def matches(self, delta):
+        if self.room_ids is not None and delta.get("room_id") not in self.room_ids \
+                and delta.get("old_room_id") not in self.room_ids:
+            return False
+        # a series change concerns all the days of its room
+        if self.dates is not None and delta["type"] == "meeting" and delta.get("date") not in self.dates \
+                and delta.get("old_date") not in self.dates:
+            return False
+        return True
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # the client can't keep up, it gets a reset instead of the backlog
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+
+# Fans the meeting_changes notifications (migration 4c8b1e6d2a97) out to the WebSocket clients of
+# this worker. Every worker LISTENs on its own, so a change made through any worker, or directly in
+# the database, reaches all clients. Each notification is parsed once and forwarded as received.
+class LiveFeed:
+    def __init__(self):
+        self._subscriptions = set()
+
+    def subscribe(self, room_ids=None, dates=None):
+        subscription = Subscription(room_ids, dates)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.discard(subscription)
+
+    def notify(self, payload):
+        if not self._subscriptions:
+            return
+        delta = json.loads(payload)
+        for subscription in self._subscriptions:
+            if subscription.matches(delta):
+                subscription.put(payload)
+
+    def reset(self):
+        for subscription in self._subscriptions:
+            subscription.put(RESET)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+live_feed = LiveFeed()
+pg_listener.listen(CHANNEL, live_feed.notify)
+pg_listener.on_reset(live_feed.reset)
+
+
+async def send_changes(websocket: WebSocket, subscription):
+    while True:
+        await websocket.send_text(await subscription.queue.get())
+
+
+# Serves an accepted connection until the client leaves. The client may replace its
+# subscription by sending {"room_ids": [...], "dates": ["YYYY-MM-DD", ...]}.
+async def serve(websocket: WebSocket, room_ids=None, dates=None):
+    subscription = live_feed.subscribe(room_ids, dates)
+    sender = asyncio.create_task(send_changes(websocket, subscription))
+    try:
+        subscription.put(SUBSCRIBED)
+        while True:
+            message = await websocket.receive_text()
+            try:
+                message = json.loads(message)
+                subscription.update([int(room_id) for room_id in message.get("room_ids") or []],
+                                    [date.fromisoformat(day) for day in message.get("dates") or []])
+            except (AttributeError, TypeError, ValueError):
+                subscription.put(INVALID_SUBSCRIPTION)
+                continue
+            subscription.put(SUBSCRIBED)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_feed.unsubscribe(subscription)
+        sender.cancel()
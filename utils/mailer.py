@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import smtplib
+import ssl
+import time
+from email.message import EmailMessage
+from config.config import EMAIL_USERNAME, EMAIL_PASSWORD, SMTP_HOST, SMTP_PORT, SMTP_POOL_SIZE, SMTP_MAX_IDLE, \
+    SMTP_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+# Raised by Mailer.send when some messages may get through on a retry; failed are their
+# receivers, every other message was handed over or refused for good and must not be sent again
+class DeliveryError(smtplib.SMTPException):
+    def __init__(self, message, failed):
+        super().__init__(message)
+        self.failed = failed
+
+
+class SMTPConnection:
+    def __init__(self, server):
+        self.server = server
+        self.used_at = time.monotonic()
+
+
+# Authenticated SMTP_SSL sessions kept open between sends. smtplib is blocking,
+# so every network call runs in a worker thread and the event loop never waits on the server.
+class Mailer:
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, username=EMAIL_USERNAME, password=EMAIL_PASSWORD,
+                 pool_size=SMTP_POOL_SIZE, max_idle=SMTP_MAX_IDLE, batch_size=SMTP_BATCH_SIZE):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_idle = max_idle
+        self.batch_size = batch_size
+        self._idle = []
+        self._slots = asyncio.Semaphore(pool_size)
+        self._context = ssl.create_default_context()
+
+    @property
+    def enabled(self):
+        return bool(self.username and self.password)
+
+    def _connect(self):
+        server = smtplib.SMTP_SSL(self.host, self.port, context=self._context)
+        server.login(self.username, self.password)
+        return SMTPConnection(server)
+
+    @staticmethod
+    def _quit(connection):
+        try:
+            connection.server.quit()
+        except smtplib.SMTPException:
+            connection.server.close()
+        except OSError:
+            pass
+
+    def _alive(self, connection):
+        if time.monotonic() - connection.used_at > self.max_idle:
+            return False
+        try:
+            return connection.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    async def _acquire(self):
+        while self._idle:
+            connection = self._idle.pop()
+            if await asyncio.to_thread(self._alive, connection):
+                return connection
+            await asyncio.to_thread(self._quit, connection)
+        return await asyncio.to_thread(self._connect)
+
+    def _release(self, connection):
+        connection.used_at = time.monotonic()
+        self._idle.append(connection)
+
+    @staticmethod
+    def _send_batch(connection, messages):
+        # returns (handled, failed): the number of leading messages that were handed over, refused
+        # for good (5xx, skipped) or refused for now (4xx, in failed, to retry later), and stops at the
+        # first failure of the connection itself, which another connection may get through
+        failed = []
+        for handled, message in enumerate(messages):
+            try:
+                connection.server.send_message(message)
+            except smtplib.SMTPRecipientsRefused as e:
+                codes = [code for code, _ in e.recipients.values()]
+                logger.warning("Recipient refused: %s %s", message["To"], codes)
+                if any(code < 500 for code in codes):
+                    failed.append(message)
+            except smtplib.SMTPResponseException as e:
+                logger.warning("Message to %s refused: %s %r", message["To"], e.smtp_code, e.smtp_error)
+                if e.smtp_code < 500:
+                    failed.append(message)
+            except (smtplib.SMTPException, OSError):
+                return handled, failed
+            except Exception:
+                logger.exception("Sending to %s failed", message["To"])
+                return handled, failed
+        return len(messages), failed
+
+    # Sends the messages in batches of batch_size per pooled connection. A connection that failed
+    # is quit and replaced once. Raises DeliveryError with the receivers worth a retry: the ones
+    # refused for now and, if the replacement failed too, the ones not sent yet.
+    async def send(self, messages):
+        messages = list(messages)
+        handled = 0
+        failed = []
+        replaced = False
+        while handled < len(messages):
+            batch = messages[handled:handled + self.batch_size]
+            async with self._slots:
+                try:
+                    connection = await (asyncio.to_thread(self._connect) if replaced else self._acquire())
+                except (smtplib.SMTPException, OSError) as e:
+                    raise DeliveryError(f"SMTP connection failed: {e!r}",
+                                        [message["To"] for message in failed + messages[handled:]]) from e
+                batch_handled, batch_failed = await asyncio.to_thread(self._send_batch, connection, batch)
+                if batch_handled < len(batch):
+                    await asyncio.to_thread(self._quit, connection)
+                else:
+                    self._release(connection)
+            handled += batch_handled
+            failed += batch_failed
+            if batch_handled == len(batch):
+                replaced = False
+            elif replaced:
+                raise DeliveryError("SMTP connection lost while sending",
+                                    [message["To"] for message in failed + messages[handled:]])
+            else:
+                replaced = True
+        if failed:
+            raise DeliveryError(f"{len(failed)} of {len(messages)} messages refused for now",
+                                [message["To"] for message in failed])
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await asyncio.to_thread(self._quit, connection)
+
+
+def build_message(receiver, subject, body):
+    # one message per recipient, so invitees don't see each other's addresses
+    message = EmailMessage()
+    message["From"] = str(EMAIL_USERNAME)
+    message["To"] = receiver
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+def invitation_messages(receivers, organizer, room, meeting_name, start_time, end_time):
+    subject = "Organized meeting"
+    body = (f"You were invited to meeting {meeting_name} organized by {organizer}.\n"
+            f"Meeting get place in {room} at {start_time} and continue until {end_time}")
+    return [build_message(receiver, subject, body) for receiver in receivers]
+
+
+mailer = Mailer()
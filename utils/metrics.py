@@ -0,0 +1,106 @@
+import hmac
+import os
+import time
+from fastapi import Header, HTTPException, status
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from config.config import GOOGLE_API_URL, TELEGRAM_API_URL, DEBUG, METRICS_TOKEN
+from config.db import QueryStats, query_stats
+
+# Prometheus metrics served on /metrics. With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR
+# to an empty directory shared by them (cleared before start), /metrics then aggregates all workers.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Latency of the API requests until the response is sent",
+                            ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "API requests being served", ["method"],
+                             multiprocess_mode="livesum")
+BOOKING_CONFLICTS = Counter("booking_conflicts_total", "Bookings rejected because the room is already booked", ["kind"])
+DB_QUERIES = Histogram("db_queries_per_request", "Database queries run by an API request", ["route"],
+                       buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500))
+DB_TIME = Histogram("db_time_per_request_seconds", "Time an API request spent in database queries", ["route"],
+                    buckets=LATENCY_BUCKETS)
+OUTBOUND_LATENCY = Histogram("outbound_request_duration_seconds",
+                             "Latency of the calls to external APIs, retries included", ["service", "method", "status"],
+                             buckets=LATENCY_BUCKETS)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+
+# kind label of BOOKING_CONFLICTS
+MEETING, BATCH, SERIES, UPDATE = "meeting", "batch", "series", "update"
+
+
+def service_of(url):
+    url = str(url)
+    if url.startswith(GOOGLE_API_URL):
+        return "google"
+    if url.startswith(TELEGRAM_API_URL):
+        return "telegram"
+    return "other"
+
+
+def observe_outbound(url, method, started, response=None, error=None):
+    status = type(error).__name__ if error is not None else str(response.status_code)
+    OUTBOUND_LATENCY.labels(service_of(url), method.upper(), status).observe(time.perf_counter() - started)
+
+
+def route_of(scope):
+    # the path template (/app/meetings/{id}), not the path, so ids don't multiply the series
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+# Plain ASGI middleware, so a streamed response is measured until its last chunk.
+# Also counts the request's queries (config/db.py), in DEBUG mode returned as the headers below;
+# the headers of a streamed response only cover the queries made before its first chunk.
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+        stats = QueryStats()
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if DEBUG:
+                    message["headers"] = [*message.get("headers", []),
+                                          (QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()),
+                                          (QUERY_TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.2f}".encode())]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        token = query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            query_stats.reset(token)
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            route = route_of(scope)
+            REQUEST_LATENCY.labels(method, route, str(status)).observe(time.perf_counter() - started)
+            DB_QUERIES.labels(route).observe(stats.count)
+            DB_TIME.labels(route).observe(stats.seconds)
+
+
+def render():
+    # body and content type of the /metrics response
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# Dependency of /metrics: the scraper authenticates with METRICS_TOKEN, not a user's expiring JWT
+async def check_scrape_token(authorization: str = Header(None)):
+    scheme, _, token = (authorization or "").partition(" ")
+    if not METRICS_TOKEN or scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token",
+                            headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+from datetime import timedelta
+from config.config import OUTBOX_POLL_INTERVAL, OUTBOX_BATCH_SIZE, OUTBOX_CONCURRENCY, OUTBOX_MAX_ATTEMPTS, OUTBOX_LEASE, \
+    OUTBOX_RETENTION_DAYS
+from config.db import AsyncSessionLocal
+from crud import crud
+from utils.bot_requests import telegram_notifier
+from utils import calendar_sync
+from utils.http_client import close_http_client
+from utils.mailer import mailer, invitation_messages, DeliveryError
+
+logger = logging.getLogger(__name__)
+
+# Side effects written to the outbox table by the routes and delivered here
+CALENDAR_CREATE = "calendar.create"
+CALENDAR_DELETE = "calendar.delete"
+TELEGRAM_SEND = "telegram.send"
+EMAIL_INVITE = "email.invite"
+
+handlers = {}
+
+
+# Raised by a handler that did part of its work, payload is what is left for the retry
+class PartialFailure(Exception):
+    def __init__(self, error, payload):
+        super().__init__(repr(error))
+        self.payload = payload
+
+
+def outbox_handler(kind):
+    def register(func):
+        handlers[kind] = func
+        return func
+    return register
+
+
+# Batch handlers take the payloads of all claimed events of their kind and return
+# one error (None on success) per payload
+batch_handlers = {}
+
+
+def outbox_batch_handler(kind):
+    def register(func):
+        batch_handlers[kind] = func
+        return func
+    return register
+
+
+def calendar_errors(operations, statuses, count):
+    # operations are {payload index: (google_token, operation)}, payloads without one have nothing to do
+    errors = [None] * count
+    for index, (_, operation), status in zip(operations, operations.values(), statuses):
+        if not calendar_sync.operation_ok(operation, status):
+            errors[index] = RuntimeError(f"Google Calendar {operation[0]} failed: {status}")
+    return errors
+
+
+@outbox_batch_handler(CALENDAR_CREATE)
+async def handle_calendar_create(payloads):
+    async with AsyncSessionLocal() as db:
+        meetings = await crud.get_meetings_with_details(ids=[payload["meeting_id"] for payload in payloads], db=db)
+    meetings = {meeting.id: meeting for meeting in meetings}
+    operations = {}
+    for index, payload in enumerate(payloads):
+        meeting = meetings.get(payload["meeting_id"])
+        # a meeting cancelled before its event got created needs nothing
+        if meeting and meeting.user.google_token:
+            operations[index] = (meeting.user.google_token,
+                                 calendar_sync.insert_operation(meeting, payload["message_text"]))
+    statuses = await calendar_sync.execute(list(operations.values()))
+    return calendar_errors(operations, statuses, len(payloads))
+
+
+@outbox_batch_handler(CALENDAR_DELETE)
+async def handle_calendar_delete(payloads):
+    async with AsyncSessionLocal() as db:
+        users = await crud.get_users(ids={payload["user_id"] for payload in payloads}, db=db)
+    tokens = {user.id: user.google_token for user in users}
+    operations = {}
+    for index, payload in enumerate(payloads):
+        if tokens.get(payload["user_id"]):
+            operations[index] = (tokens[payload["user_id"]], calendar_sync.delete_operation(payload["meeting_id"]))
+    statuses = await calendar_sync.execute(list(operations.values()))
+    return calendar_errors(operations, statuses, len(payloads))
+
+
+@outbox_handler(TELEGRAM_SEND)
+async def handle_telegram_send(payload):
+    # rate limited and merged with other messages to the chat, raises if the digest wasn't delivered
+    await telegram_notifier.notify(payload["chat_id"], payload["text"])
+
+
+@outbox_handler(EMAIL_INVITE)
+async def handle_email_invite(payload):
+    async with AsyncSessionLocal() as db:
+        meeting = await crud.get_meeting_with_details(id=payload["meeting_id"], db=db)
+    if not meeting or not meeting.invitation:
+        return
+    # receivers are the emails invited with the event, still invited; events without them mail every invitee
+    invited = [invitation.user_email for invitation in meeting.invitation]
+    receivers = [email for email in payload["receivers"] if email in invited] if "receivers" in payload else invited
+    try:
+        await mailer.send(invitation_messages(receivers=receivers,
+                                              organizer=meeting.organizer, room=meeting.room.name,
+                                              meeting_name=meeting.name,
+                                              start_time=payload["start_time"], end_time=payload["end_time"]))
+    except DeliveryError as e:
+        # the retry mails the failed receivers only
+        raise PartialFailure(e, {**payload, "receivers": e.failed}) from e
+
+
+# Seconds between two deletions of the delivered events older than OUTBOX_RETENTION_DAYS
+PURGE_INTERVAL = 3600
+
+
+# Exponential backoff between attempts, capped at one hour
+def retry_delay(attempts):
+    return timedelta(seconds=min(5 * 2 ** (attempts - 1), 3600))
+
+
+class OutboxDispatcher:
+    def __init__(self, poll_interval=OUTBOX_POLL_INTERVAL, batch_size=OUTBOX_BATCH_SIZE,
+                 concurrency=OUTBOX_CONCURRENCY, max_attempts=OUTBOX_MAX_ATTEMPTS, lease=OUTBOX_LEASE,
+                 retention=timedelta(days=OUTBOX_RETENTION_DAYS)):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.retention = retention
+        self._purged_at = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._wake = asyncio.Event()
+        self._task = None
+
+    # called after a commit that wrote outbox events, so they go out without waiting for the next poll
+    def wake(self):
+        self._wake.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        while True:
+            self._wake.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                await self.purge()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def purge(self):
+        # at most every PURGE_INTERVAL, while the dispatcher has nothing else to do
+        now = asyncio.get_running_loop().time()
+        if self._purged_at is not None and now - self._purged_at < PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        try:
+            async with AsyncSessionLocal() as db:
+                deleted = await crud.purge_outbox_events(older_than=self.retention, db=db)
+        except Exception:
+            logger.exception("Outbox purge failed")
+        else:
+            if deleted:
+                logger.info("Deleted %s delivered outbox events", deleted)
+
+    async def dispatch_once(self):
+        async with AsyncSessionLocal() as db:
+            events = await crud.claim_outbox_events(db=db, limit=self.batch_size, lease_seconds=self.lease)
+        batches = {}
+        for event in events:
+            if event.kind in batch_handlers:
+                batches.setdefault(event.kind, []).append(event)
+        await asyncio.gather(*(self.process_batch(kind, batch) for kind, batch in batches.items()),
+                             *(self.process(event) for event in events if event.kind not in batch_handlers))
+        return len(events)
+
+    async def process(self, event):
+        async with self._semaphore:
+            error = None
+            try:
+                handler = handlers[event.kind]
+                await handler(event.payload)
+            except Exception as e:
+                error = e
+        await self.record(event, error)
+
+    async def process_batch(self, kind, events):
+        async with self._semaphore:
+            try:
+                errors = await batch_handlers[kind]([event.payload for event in events])
+            except Exception as e:
+                errors = [e] * len(events)
+        for event, error in zip(events, errors):
+            await self.record(event, error)
+
+    async def record(self, event, error):
+        payload = error.payload if isinstance(error, PartialFailure) else None
+        if error is not None:
+            logger.warning("Outbox event %s (%s) failed on attempt %s: %r", event.id, event.kind, event.attempts, error)
+            error = repr(error)
+        async with AsyncSessionLocal() as db:
+            if error is None:
+                await crud.complete_outbox_event(id=event.id, db=db)
+            else:
+                retry_in = retry_delay(event.attempts) if event.attempts < self.max_attempts else None
+                await crud.fail_outbox_event(id=event.id, error=error, retry_in=retry_in, db=db, payload=payload)
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+# Standalone dispatcher: python -m utils.outbox
+async def main():
+    try:
+        await OutboxDispatcher().run()
+    finally:
+        await telegram_notifier.close()
+        await mailer.close()
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from fastapi import HTTPException, status
+
+# The list endpoints return one page as the body and the cursor of the next page
+# in this header, which is absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+INVALID_CURSOR_EXCEPTION = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor!")
+
+
+# Opaque cursor: the sort key of the last row of a page, as urlsafe base64 JSON
+def encode_cursor(values):
+    data = json.dumps(values, default=lambda value: value.isoformat(), separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, types):
+    # types converts the JSON values back, e.g. (datetime, str) for a meeting cursor
+    if cursor is None:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(datetime.fromisoformat(value) if type_ is datetime else type_(value)
+                     for type_, value in zip(types, values))
+    except (ValueError, TypeError, binascii.Error):
+        raise INVALID_CURSOR_EXCEPTION
+
+
+# Crud list functions fetch limit + 1 rows, the extra one tells whether a next page exists
+def paginate(items, limit, response, key):
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(items[-1]))
+    return items
+
+
+def meeting_key(meeting):
+    return [meeting.start_time, meeting.id]
+
+
+MEETING_CURSOR = (datetime, str)
+
+
+def user_key(user):
+    return [user.id]
+
+
+USER_CURSOR = (str,)
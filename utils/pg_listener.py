@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import asyncpg
+from config.config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME, PG_LISTENER_RECONNECT_DELAY
+
+logger = logging.getLogger(__name__)
+
+
+# One dedicated connection (outside the SQLAlchemy pool) LISTENing on the channels that
+# in-process caches subscribe to. While it is down notifications are lost, so subscribers
+# register a reset callback and must not trust their cache unless `connected` is set.
+class PgListener:
+    def __init__(self, reconnect_delay=PG_LISTENER_RECONNECT_DELAY):
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self._channels = {}
+        self._resets = []
+        self._task = None
+
+    def listen(self, channel, callback):
+        # callback(payload) runs on the event loop for every notification on the channel
+        self._channels.setdefault(channel, []).append(callback)
+
+    def on_reset(self, callback):
+        self._resets.append(callback)
+
+    def _notify(self, connection, pid, channel, payload):
+        for callback in self._channels.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Notification handler for %s failed", channel)
+
+    def _reset(self):
+        for callback in self._resets:
+            callback()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(user=DB_USER, password=DB_PASSWORD, host=DB_HOST,
+                                                   port=DB_PORT, database=DB_NAME)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                for channel in self._channels:
+                    await connection.add_listener(channel, self._notify)
+                # anything cached before this point may have missed notifications
+                self._reset()
+                self.connected = True
+                await closed.wait()
+                logger.warning("LISTEN connection lost, reconnecting")
+            except Exception:
+                # OSError, asyncpg.PostgresError or the InterfaceError of a dropped connection;
+                # CancelledError (stop()) is not an Exception and ends the loop
+                logger.exception("LISTEN connection failed, reconnecting")
+            finally:
+                self.connected = False
+                self._reset()
+                if connection is not None and not connection.is_closed():
+                    try:
+                        await connection.close(timeout=self.reconnect_delay)
+                    except Exception:
+                        connection.terminate()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+pg_listener = PgListener()
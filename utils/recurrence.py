@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta
+from utils.dates import LOCAL_TZ
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+# shortest gap between two occurrences of interval 1, a series' meeting can't be longer
+MIN_STEP = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1), "monthly": timedelta(days=28)}
+
+
+def add_months(day: date, months):
+    # None when the month has no such day (e.g. the 31st), that month is skipped
+    month = day.month - 1 + months
+    try:
+        return day.replace(year=day.year + month // 12, month=month % 12 + 1)
+    except ValueError:
+        return None
+
+
+# Occurrences of a series (models.MeetingSeries or schemas.CreateMeetingSeries) overlapping
+# [window_start, window_end), as (start, end) pairs in LOCAL_TZ. The rule is applied to the
+# local wall clock of the first occurrence, so a 10:00 meeting stays at 10:00 across DST changes.
+# count limits the generated occurrences, exdates (local days) are removed afterwards.
+def occurrences(series, window_start=None, window_end=None):
+    first = series.start_time.astimezone(LOCAL_TZ)
+    duration = series.end_time - series.start_time
+    exdates = set(series.exdates or [])
+    wall_clock = first.replace(tzinfo=None)
+    index = 0
+    if series.freq != "monthly" and window_start is not None:
+        # daily and weekly steps are fixed, so jump straight to the window (one step early for DST shifts)
+        step = MIN_STEP[series.freq] * series.interval
+        index = max(0, (window_start - duration - first) // step - 1)
+    number = index
+    while True:
+        if series.count is not None and number >= series.count:
+            return
+        if series.freq == "monthly":
+            day = add_months(wall_clock.date(), index * series.interval)
+            index += 1
+            if day is None:
+                continue
+            start = datetime.combine(day, wall_clock.time(), tzinfo=LOCAL_TZ)
+        else:
+            start = (wall_clock + MIN_STEP[series.freq] * series.interval * index).replace(tzinfo=LOCAL_TZ)
+            index += 1
+        number += 1
+        if series.until is not None and start > series.until:
+            return
+        if window_end is not None and start >= window_end:
+            return
+        end = start + duration
+        if (window_start is None or end > window_start) and start.date() not in exdates:
+            yield start, end
+
+
+def overlapping(first, second):
+    # first pair of overlapping periods of two start-sorted lists, or None
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i][0] < second[j][1] and second[j][0] < first[i][1]:
+            return first[i], second[j]
+        if first[i][1] <= second[j][1]:
+            i += 1
+        else:
+            j += 1
+    return None
@@ -2,28 +2,20 @@ from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status, Security
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 import os
-from config.config import SECRET_KEY, ALGORITHM, GOOGLE_CLIENT_ID, ACCESS_TOKEN_EXPIRE_MINUTES, EMAIL_PASSWORD, EMAIL_USERNAME
-from config.db import SessionLocal
+from config.config import SECRET_KEY, ALGORITHM, GOOGLE_CLIENT_ID, ACCESS_TOKEN_EXPIRE_MINUTES
+from config.db import AsyncSessionLocal
 from crud import crud
-from schemas.schemas import TokenData, GoogleToken, GetUser, CreateUser
+from utils.cache import user_cache, role_cache
+from utils.pg_listener import pg_listener
+from schemas.schemas import TokenData, GoogleToken, GetUser, CreateUser, GetUserRole, GetMeetingSummary
 
-import email, smtplib, ssl
 
-from email import encoders
-from email.mime.base import MIMEBase
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-
-
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 # Helper to read numbers using var envs
@@ -55,6 +47,7 @@ CREDENTIALS_EXCEPTION = HTTPException(
     detail='Could not validate credentials',
     headers={'WWW-Authenticate': 'Bearer'},
 )
+PERMISSION_EXCEPTION = HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions denied!")
 
 
 # def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -93,11 +86,11 @@ def create_token(email: str):
     return access_token
 
 
-def valid_email_from_db(email, db: Session = Depends(get_db)):
-    return crud.check_email(db=db, email=email)
+async def valid_email_from_db(email, db: AsyncSession = Depends(get_db)):
+    return await crud.check_email(db=db, email=email)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         expire_date: int = payload.get('exp')
@@ -113,40 +106,56 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(email=email)
     except JWTError:
         raise CREDENTIALS_EXCEPTION
-    user = crud.check_email(db=db, email=email)
+    # the caches are only trusted while other workers' role and user changes are received
+    user = user_cache.get(email) if pg_listener.connected else None
     if user is None:
-        raise CREDENTIALS_EXCEPTION
+        user_generation, role_generation = user_cache.generation, role_cache.generation
+        # the role comes in the same query, so a following permission check needs no round trip
+        user_obj = await crud.get_user_with_role(db=db, email=email)
+        if user_obj is None:
+            raise CREDENTIALS_EXCEPTION
+        user = GetUser.model_validate(user_obj)
+        if pg_listener.connected:
+            if user_obj.role is not None and role_generation == role_cache.generation:
+                role_cache.set(user_obj.role.id, GetUserRole.model_validate(user_obj.role))
+            if user_generation == user_cache.generation:
+                user_cache.set(email, user)
 
     return user
 
 
-async def email_sender(receivers, organizer, room, meeting_name, start_time, end_time):
-    subject = "Organized meeting"
-    body = (f"You were invited to meeting {meeting_name} organized by {organizer}.\n"
-            f"Meeting get place in {room} at {start_time} and continue until {end_time}")
-    sender_email = str(EMAIL_USERNAME)
-    receiver_email = receivers
-    password = str(EMAIL_PASSWORD)
-
-    # Create a multipart message and set headers
-    message = MIMEMultipart()
-    message["From"] = sender_email
-    message["To"] = ", ".join(receivers)
-    message["Subject"] = subject
-    # message["Bcc"] = receiver_email[1: len(receivers)]  # Recommended for mass emails
-
-    # Add body to email
-    message.attach(MIMEText(body, "plain"))
-
-    # Convert message to string
-    text = message.as_string()
-
-    # Log in to server using secure context and send email
-    context = ssl.create_default_context()
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-        server.login(sender_email, password)
-        server.sendmail(sender_email, receiver_email, text)
-        # print("Messages were sent successfully!")
+async def get_user_role(role_id, db: AsyncSession):
+    if not role_id:
+        return None
+    role = role_cache.get(role_id) if pg_listener.connected else None
+    if role is None:
+        generation = role_cache.generation
+        role_obj = await crud.get_role(role_id, db)
+        if role_obj is None:
+            return None
+        role = GetUserRole.model_validate(role_obj)
+        if pg_listener.connected and generation == role_cache.generation:
+            role_cache.set(role_id, role)
+    return role
+
+
+# Dependency that returns the current user if their role grants the permission
+def require_permission(permission: str):
+    async def check_permission(current_user: GetUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+        role = await get_user_role(current_user.role_id, db)
+        if role is None or permission not in role.permissions:
+            raise PERMISSION_EXCEPTION
+        return current_user
+
+    return check_permission
+
+
+# Meetings loaded without their invitations (crud with_invitations=False) as GetMeetingSummary,
+# so serialising them doesn't touch the unloaded relationship
+def meeting_list(meetings, with_invitations):
+    if with_invitations:
+        return meetings
+    return [GetMeetingSummary.model_validate(meeting) for meeting in meetings]
 
 
 # def verify_token(token: str, credentials_exception):
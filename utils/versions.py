@@ -0,0 +1,77 @@
+import hashlib
+from sqlalchemy.ext.asyncio import AsyncSession
+from crud import crud
+from utils.cache import TTLCache, room_cache
+from utils.pg_listener import pg_listener
+
+CHANNEL = "change_versions"
+ROOMS_SCOPE = "rooms"
+
+
+def meetings_scope(room_id, day):
+    # same text as the meetings_change_version trigger builds
+    return f"meetings:{room_id}:{day.isoformat()}"
+
+
+def series_scope(room_id):
+    return f"series:{room_id}"
+
+
+# Versions of rooms and of each room's meeting days, bumped by database triggers
+# (migration b6e0a3d8f214). Cached per process and kept current through the
+# change_versions notifications, so an unchanged version costs no query.
+class ChangeVersions:
+    def __init__(self, maxsize=10000, ttl=3600):
+        self._versions = TTLCache(maxsize=maxsize, ttl=ttl)
+        # bumped by every notification and reset, a read that raced one is not cached
+        self._sequence = 0
+
+    def notify(self, payload):
+        scope, _, version = payload.rpartition("=")
+        self._sequence += 1
+        self._versions.set(scope, max(int(version), self._versions.get(scope, 0)))
+
+    def reset(self):
+        self._sequence += 1
+        self._versions.clear()
+
+    async def get(self, scope, db: AsyncSession):
+        if pg_listener.connected:
+            version = self._versions.get(scope)
+            if version is not None:
+                return version
+        sequence = self._sequence
+        version = await crud.get_change_version(scope=scope, db=db)
+        if pg_listener.connected and sequence == self._sequence:
+            self._versions.set(scope, version)
+        return version
+
+    async def etag(self, scope, db: AsyncSession, *variant):
+        # strong ETag of a response built from the scope's data, variant covers query options
+        version = await self.get(scope, db)
+        digest = hashlib.sha1(":".join(map(str, (scope, version, *variant))).encode()).hexdigest()[:20]
+        return f'"{digest}"'
+
+
+def not_modified(request, etag):
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+change_versions = ChangeVersions()
+pg_listener.listen(CHANNEL, change_versions.notify)
+pg_listener.on_reset(change_versions.reset)
+
+
+def invalidate_rooms(payload):
+    # rooms changed in another worker (or outside the API)
+    if payload.rpartition("=")[0] == ROOMS_SCOPE:
+        room_cache.clear()
+
+
+pg_listener.listen(CHANNEL, invalidate_rooms)
+pg_listener.on_reset(room_cache.clear)